@@ -0,0 +1,106 @@
+"""Shared helpers for the benchmark scripts: isolated environment, timing stats and JSON reports."""
+import os
+import sys
+import json
+import time
+import platform
+import resource
+import subprocess
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_WORKDIR = os.path.join(REPO_ROOT, ".data_cache", "bench")
+
+
+def configure_environment(data_path: str = None, workdir: str = DEFAULT_WORKDIR, keep_caches: bool = False):
+    """
+    Point every on-disk cache (parquet sidecar, plot store, forecast store, LLM
+    cache) at workdir so runs start cold and never touch the real caches.
+    Must run before any repo module is imported: they read these at import.
+    """
+    if not keep_caches and os.path.isdir(workdir):
+        import shutil
+        shutil.rmtree(workdir)
+    os.makedirs(workdir, exist_ok=True)
+    if data_path:
+        os.environ["SALES_DATA_PATH"] = os.path.abspath(data_path)
+    os.environ.setdefault("SALES_DATA_CACHE_DIR", os.path.join(workdir, "sidecar"))
+    os.environ.setdefault("PLOT_DIR", os.path.join(workdir, "plots"))
+    os.environ.setdefault("FORECAST_STORE_PATH", os.path.join(workdir, "forecast_store.sqlite3"))
+    os.environ.setdefault("LLM_CACHE_PATH", os.path.join(workdir, "llm_cache.sqlite3"))
+    # The background store refresher would compete with the measured requests
+    os.environ.setdefault("FORECAST_STORE_INTERVAL", "0")
+    # Likewise the start-up warmup (data load, Prophet import, pool spawn); a
+    # run that wants to measure a warmed server sets STARTUP_WARMUP=1 itself
+    os.environ.setdefault("STARTUP_WARMUP", "0")
+    if REPO_ROOT not in sys.path:
+        sys.path.insert(0, REPO_ROOT)
+
+
+def latency_stats(samples_s) -> dict:
+    """Summary of latencies given in seconds, reported in milliseconds."""
+    if not len(samples_s):
+        return {"count": 0}
+    ms = np.asarray(samples_s, dtype=np.float64) * 1000
+    return {
+        "count": int(ms.size),
+        "mean_ms": float(ms.mean()),
+        "min_ms": float(ms.min()),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "max_ms": float(ms.max()),
+    }
+
+
+def timed(fn, repeat: int = 5, warmup: int = 1, setup=None) -> dict:
+    """Run fn repeat times (after warmup untimed runs) and return latency_stats; setup runs untimed before each call."""
+    for _ in range(warmup):
+        if setup:
+            setup()
+        fn()
+    samples = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return latency_stats(samples)
+
+
+def peak_rss_mb() -> dict:
+    # ru_maxrss is KiB on Linux and bytes on macOS; children only counts reaped processes
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return {
+        "self": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale,
+        "children": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale,
+    }
+
+
+def environment_info() -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, timeout=10,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def write_report(report: dict, path: str = None):
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if path:
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(text + "\n")
+        print(f"Report written to {path}")
+    else:
+        print(text)
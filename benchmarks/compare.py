@@ -0,0 +1,46 @@
+"""
+Diff two benchmark reports produced by benchmarks.micro or benchmarks.load.
+
+    python -m benchmarks.compare before.json after.json [--metric p50_ms]
+
+Prints every latency metric present in both reports with its relative change.
+"""
+import json
+import argparse
+
+METRICS = ("p50_ms", "p95_ms", "p99_ms", "throughput_rps")
+
+
+def _flatten(node, prefix=""):
+    if isinstance(node, dict):
+        for key, value in node.items():
+            yield from _flatten(value, f"{prefix}.{key}" if prefix else key)
+    elif isinstance(node, (int, float)) and not isinstance(node, bool):
+        yield prefix, float(node)
+
+
+def compare(before: dict, after: dict, metrics=METRICS) -> list:
+    old = dict(_flatten({k: v for k, v in before.items() if k not in ("environment", "config")}))
+    new = dict(_flatten({k: v for k, v in after.items() if k not in ("environment", "config")}))
+    rows = []
+    for key in sorted(old.keys() & new.keys()):
+        if key.rsplit(".", 1)[-1] in metrics or key.startswith("peak_rss_mb"):
+            change = (new[key] - old[key]) / old[key] if old[key] else None
+            rows.append((key, old[key], new[key], change))
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("before")
+    parser.add_argument("after")
+    parser.add_argument("--metric", nargs="+", default=list(METRICS))
+    args = parser.parse_args()
+    with open(args.before) as f:
+        before = json.load(f)
+    with open(args.after) as f:
+        after = json.load(f)
+    print(f"{before['environment'].get('commit')} -> {after['environment'].get('commit')}")
+    for key, old, new, change in compare(before, after, args.metric):
+        delta = f"{change:+.1%}" if change is not None else "n/a"
+        print(f"{key:60s} {old:12.2f} {new:12.2f} {delta:>8s}")
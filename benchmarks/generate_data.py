@@ -0,0 +1,50 @@
+"""
+Scale synthetic_sales_data.csv up to an arbitrary row count.
+
+    python -m benchmarks.generate_data --rows 10000000 --output .data_cache/bench_data/sales_10m.csv
+
+Rows are resampled from the source file with the same columns and categories;
+prices get multiplicative noise and years are spread over --years years ending
+at the source's last year, so per-segment series also get longer.
+"""
+import os
+import argparse
+import numpy as np
+import pandas as pd
+from benchmarks.common import REPO_ROOT
+
+SOURCE_PATH = os.path.join(REPO_ROOT, "synthetic_sales_data.csv")
+CHUNK_ROWS = 500_000
+
+
+def generate(rows: int, output: str, years: int = 3, seed: int = 0, source: str = SOURCE_PATH) -> str:
+    base = pd.read_csv(source)
+    rng = np.random.default_rng(seed)
+    last_year = int(base["Year"].max())
+    if os.path.dirname(output):
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+    written = 0
+    with open(output, "w", newline="") as f:
+        while written < rows:
+            n = min(CHUNK_ROWS, rows - written)
+            chunk = base.iloc[rng.integers(0, len(base), n)].reset_index(drop=True)
+            chunk["Year"] = last_year - rng.integers(0, years, n)
+            chunk["Price"] = (chunk["Price"] * rng.lognormal(0, 0.1, n)).round(2)
+            chunk.to_csv(f, index=False, header=written == 0)
+            written += n
+    return output
+
+
+def default_output(rows: int) -> str:
+    return os.path.join(REPO_ROOT, ".data_cache", "bench_data", f"sales_{rows}.csv")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--years", type=int, default=3, help="Number of years the generated rows span")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+    path = generate(args.rows, args.output or default_output(args.rows), args.years, args.seed)
+    print(f"Wrote {args.rows} rows to {path}")
@@ -0,0 +1,140 @@
+"""
+In-process load driver for the API.
+
+    python -m benchmarks.load --concurrency 16 --requests 400 --llm-latency 0.5 --output bench_load.json
+
+Runs the FastAPI app (including its lifespan) behind httpx's ASGI transport,
+with the LLM replaced by LocalStubChatClient (benchmarks/stub_llm.py), and
+fires a weighted mix of /forecast, /plot and /genai-* requests from
+--concurrency workers. Reports per-route and overall p50/p95/p99 latency,
+throughput, error counts and peak RSS.
+"""
+import time
+import random
+import asyncio
+import argparse
+from collections import defaultdict
+from benchmarks.common import configure_environment, latency_stats, peak_rss_mb, environment_info, write_report
+from benchmarks.stub_llm import LocalStubChatClient
+
+# route name -> relative weight in the request mix
+DEFAULT_MIX = {
+    "forecast": 8,
+    "plot": 4,
+    "genai-insights": 2,
+    "genai-consolidated-insights": 1,
+    "genai-forecast-summary-json": 1,
+}
+PERIOD_TYPES = ["days", "weeks", "months", "years"]
+
+
+def build_request(route: str, rng: random.Random, filters: dict, args) -> tuple:
+    """(method, path, kwargs) for one request of route with randomized filters and horizon."""
+    cols = [c for c in filters if filters[c]]
+    col = rng.choice(cols)
+    body = {
+        "filters": {col: [rng.choice(filters[col])]} if rng.random() < 0.8 else {},
+        "periods": rng.randint(1, 12),
+        "period_type": rng.choice(PERIOD_TYPES),
+        "backend": rng.choice(args.backends),
+        "llm_cache": args.llm_cache,
+    }
+    if route == "forecast":
+        return "POST", "/forecast", {"json": body}
+    if route == "plot":
+        return "POST", "/plot", {"json": {**body, "render": args.render}}
+    if route == "genai-insights":
+        return "POST", "/genai-insights", {"json": body}
+    if route == "genai-consolidated-insights":
+        return "POST", "/genai-consolidated-insights", {"json": body}
+    return "GET", "/genai-forecast-summary-json", {
+        "params": {"periods": body["periods"], "period_type": body["period_type"], "llm_cache": str(args.llm_cache).lower()}
+    }
+
+
+async def drive(args) -> dict:
+    import httpx
+    import main
+    import llm_pool
+    import genai_insights
+    from utils import get_unique_filters
+
+    rng = random.Random(args.seed)
+    mix = {route: weight for route, weight in DEFAULT_MIX.items() if route in args.routes}
+    routes, weights = list(mix), list(mix.values())
+    latencies = defaultdict(list)
+    statuses = defaultdict(lambda: defaultdict(int))
+    stub = LocalStubChatClient(latency=args.llm_latency, failure_rate=args.llm_failure_rate)
+    if args.no_rate_limit:
+        genai_insights._llm_rate_limiter.rate = 0
+
+    async with main.lifespan(main.app):
+        llm_pool.get_chat_pool().client = stub
+        filters = get_unique_filters()
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            remaining = args.requests
+            deadline = time.perf_counter() + args.duration if args.duration else None
+
+            async def worker():
+                nonlocal remaining
+                while remaining > 0 and (deadline is None or time.perf_counter() < deadline):
+                    remaining -= 1
+                    route = rng.choices(routes, weights)[0]
+                    method, path, kwargs = build_request(route, rng, filters, args)
+                    start = time.perf_counter()
+                    try:
+                        response = await client.request(method, path, **kwargs)
+                        status = str(response.status_code)
+                    except Exception as e:
+                        status = type(e).__name__
+                    latencies[route].append(time.perf_counter() - start)
+                    statuses[route][status] += 1
+
+            started = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+            elapsed = time.perf_counter() - started
+
+    total = sum(len(samples) for samples in latencies.values())
+    return {
+        "elapsed_s": elapsed,
+        "requests": total,
+        "throughput_rps": total / elapsed if elapsed else None,
+        "overall": latency_stats([s for samples in latencies.values() for s in samples]),
+        "routes": {
+            route: {**latency_stats(latencies[route]), "status": dict(statuses[route])}
+            for route in routes if latencies[route]
+        },
+        "llm_stub_calls": stub.calls,
+    }
+
+
+if __name__ == "__main__":
+    from forecast_backends import BACKENDS
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", help="Sales CSV to serve (see benchmarks.generate_data)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=200, help="Total requests to send")
+    parser.add_argument("--duration", type=float, default=0, help="Stop after this many seconds (0: no limit)")
+    parser.add_argument("--routes", nargs="+", default=list(DEFAULT_MIX), choices=list(DEFAULT_MIX))
+    parser.add_argument("--backends", nargs="+", default=["prophet"], choices=BACKENDS)
+    parser.add_argument("--render", default="json", choices=["json", "svg", "png"])
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Seconds per stub LLM call")
+    parser.add_argument("--llm-failure-rate", type=float, default=0.0)
+    parser.add_argument("--llm-cache", action="store_true", help="Let GenAI routes use the LLM response cache")
+    parser.add_argument("--no-rate-limit", action="store_true", help="Disable the LLM token bucket")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    args = parser.parse_args()
+    configure_environment(args.data)
+    config = {k: v for k, v in vars(args).items() if k != "output"}
+    result = asyncio.run(drive(args))
+    report = {
+        "benchmark": "load",
+        "environment": environment_info(),
+        "config": config,
+        **result,
+        # Forecast worker processes have exited by now, so children is their peak
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    write_report(report, args.output)
@@ -0,0 +1,74 @@
+"""
+Micro-benchmarks for the data and forecasting hot paths.
+
+    python -m benchmarks.micro --data .data_cache/bench_data/sales_1000000.csv --output bench_micro.json
+
+Without --data the repo's synthetic_sales_data.csv is used. Each benchmark
+reports latency_stats over --repeat timed runs after one warmup run.
+"""
+import argparse
+from benchmarks.common import configure_environment, timed, peak_rss_mb, environment_info, write_report
+
+
+def filter_scenarios(filters: dict) -> dict:
+    # Unfiltered, one value of one column, and one value each of two columns
+    cols = [c for c in filters if filters[c]]
+    scenarios = {"none": {}}
+    if cols:
+        scenarios["one_column"] = {cols[0]: [filters[cols[0]][0]]}
+    if len(cols) > 1:
+        scenarios["two_columns"] = {cols[0]: [filters[cols[0]][0]], cols[1]: [filters[cols[1]][0]]}
+    return scenarios
+
+
+def run(repeat: int, periods: int, period_type: str, backends) -> dict:
+    import utils
+    from charts import chart_payload, render_svg
+    results = {}
+
+    results["load_data.csv"] = timed(lambda: utils.read_sales_data(utils.DATA_PATH, use_sidecar=False), repeat)
+    results["load_data.sidecar"] = timed(lambda: utils.read_sales_data(utils.DATA_PATH), repeat)
+    df = utils.load_data()
+
+    scenarios = filter_scenarios(utils.get_unique_filters())
+    for name, filters in scenarios.items():
+        results[f"filter_sales_data.{name}"] = timed(lambda: utils.filter_sales_data(df, filters), repeat)
+    series = utils.filter_sales_data(df, scenarios.get("one_column", {}))
+
+    for backend in backends:
+        results[f"forecast_sales.{backend}.cold"] = timed(
+            lambda: utils.forecast_sales(series, periods, None, backend, period_type), repeat,
+            setup=utils.clear_fit_cache,
+        )
+        results[f"forecast_sales.{backend}.cached"] = timed(
+            lambda: utils.forecast_sales(series, periods, None, backend, period_type), repeat,
+        )
+
+    payload = chart_payload(series, periods, None, "plot", None, period_type)
+    results["plot.json"] = timed(lambda: chart_payload(series, periods, None, "plot", None, period_type), repeat)
+    results["plot.svg"] = timed(lambda: render_svg(payload), repeat)
+    model, forecast = utils.fit_forecast(series, periods, None, "prophet", period_type)
+    results["plot.png"] = timed(lambda: utils._figure_png(model.plot(forecast)), repeat)
+    results["components.png"] = timed(lambda: utils._figure_png(model.plot_components(forecast)), repeat)
+    return {"rows": len(df), "series_points": len(series), "results": results}
+
+
+if __name__ == "__main__":
+    from forecast_backends import BACKENDS
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", help="Sales CSV to benchmark against (see benchmarks.generate_data)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--periods", type=int, default=6)
+    parser.add_argument("--period-type", default="months")
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=BACKENDS)
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    args = parser.parse_args()
+    configure_environment(args.data)
+    report = {
+        "benchmark": "micro",
+        "environment": environment_info(),
+        "config": {"data": args.data, "repeat": args.repeat, "periods": args.periods, "period_type": args.period_type},
+        **run(args.repeat, args.periods, args.period_type, args.backends),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    write_report(report, args.output)
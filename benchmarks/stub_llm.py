@@ -0,0 +1,40 @@
+"""Offline chat client for the load benchmark and the tests."""
+import json
+import random
+import asyncio
+from types import SimpleNamespace
+
+
+class LocalStubChatClient:
+    """
+    Offline stand-in for OpenAIChatCompletionClient. create() waits latency
+    seconds and returns an object with .content, fails with a ConnectionError
+    (a transient error the dispatcher retries) with probability failure_rate,
+    and by default answers with JSON valid for every prompt mode.
+    """
+
+    model = "local-stub"
+
+    def __init__(self, latency: float = 0.0, failure_rate: float = 0.0, responder=None):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.responder = responder or self._default_response
+        self.calls = 0
+
+    @staticmethod
+    def _default_response(prompt: str) -> str:
+        return json.dumps({
+            "genai_insights": ["Stub insight."],
+            "recommendations": ["Stub recommendation."],
+            "insight": "Stub insight.",
+            "forecast": "Stub forecast.",
+            "recommendation": "Stub recommendation.",
+        })
+
+    async def create(self, messages, **kwargs):
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.failure_rate and random.random() < self.failure_rate:
+            raise ConnectionError("stub chat client failure")
+        return SimpleNamespace(content=self.responder(messages[-1].content))
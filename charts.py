@@ -0,0 +1,111 @@
+import html
+import numpy as np
+import pandas as pd
+from utils import fit_forecast, forecast_horizon
+from metrics import span
+
+# Prophet forecast columns drawn as panels by the components chart
+COMPONENT_COLUMNS = ["trend", "yearly", "weekly", "daily", "holidays"]
+
+SVG_WIDTH = 800
+SVG_PANEL_HEIGHT = 300
+SVG_MARGIN = 50
+
+
+def _epoch_ms(ds: pd.Series) -> list:
+    return ds.to_numpy(dtype="datetime64[ms]").astype(np.int64).tolist()
+
+
+def _rounded(values: pd.Series) -> list:
+    return np.round(values.to_numpy(dtype=np.float64), 2).tolist()
+
+
+def chart_payload(df: pd.DataFrame, periods: int = 30, filters: dict = None, kind: str = "plot",
+                  backend: str = None, period_type: str = "days") -> dict:
+    """
+    Compact, renderer-agnostic chart data from the cached forecast fit.
+    Dates are epoch milliseconds. kind="plot" gives the history plus yhat and
+    its uncertainty band; kind="components" gives one series per component.
+    """
+    _, forecast = fit_forecast(df, periods, filters, backend, period_type)
+    # History at the frequency the model ran at
+    df, _, _ = forecast_horizon(df, periods, period_type)
+    if kind == "components":
+        series = {
+            col: _rounded(forecast[col]) for col in COMPONENT_COLUMNS
+            if col in forecast.columns and forecast[col].abs().sum() > 0
+        }
+        return {"kind": kind, "ds": _epoch_ms(forecast["ds"]), "components": series}
+    return {
+        "kind": kind,
+        "history": {"ds": _epoch_ms(df["ds"]), "y": _rounded(df["y"])},
+        "forecast": {
+            "ds": _epoch_ms(forecast["ds"]),
+            "yhat": _rounded(forecast["yhat"]),
+            "yhat_lower": _rounded(forecast["yhat_lower"]),
+            "yhat_upper": _rounded(forecast["yhat_upper"]),
+        },
+    }
+
+
+class _Scale:
+    def __init__(self, xs, ys, top: float):
+        self.x0, self.x1 = min(xs), max(xs)
+        self.y0, self.y1 = min(ys), max(ys)
+        self.top = top
+
+    def x(self, v) -> float:
+        span = (self.x1 - self.x0) or 1
+        return SVG_MARGIN + (v - self.x0) / span * (SVG_WIDTH - 2 * SVG_MARGIN)
+
+    def y(self, v) -> float:
+        span = (self.y1 - self.y0) or 1
+        return self.top + SVG_PANEL_HEIGHT - SVG_MARGIN - (v - self.y0) / span * (SVG_PANEL_HEIGHT - 2 * SVG_MARGIN)
+
+    def points(self, xs, ys) -> str:
+        return " ".join(f"{self.x(x):.1f},{self.y(y):.1f}" for x, y in zip(xs, ys))
+
+
+def _axis_labels(scale: _Scale, title: str) -> str:
+    first = pd.Timestamp(scale.x0, unit="ms").date()
+    last = pd.Timestamp(scale.x1, unit="ms").date()
+    bottom = scale.top + SVG_PANEL_HEIGHT - SVG_MARGIN
+    return (
+        f'<text x="{SVG_MARGIN}" y="{scale.top + 20}" font-weight="bold">{html.escape(title)}</text>'
+        f'<line x1="{SVG_MARGIN}" y1="{bottom}" x2="{SVG_WIDTH - SVG_MARGIN}" y2="{bottom}" stroke="#999"/>'
+        f'<text x="{SVG_MARGIN}" y="{bottom + 16}">{first}</text>'
+        f'<text x="{SVG_WIDTH - SVG_MARGIN}" y="{bottom + 16}" text-anchor="end">{last}</text>'
+        f'<text x="{SVG_MARGIN - 4}" y="{scale.y(scale.y1):.1f}" text-anchor="end">{scale.y1:,.0f}</text>'
+        f'<text x="{SVG_MARGIN - 4}" y="{scale.y(scale.y0):.1f}" text-anchor="end">{scale.y0:,.0f}</text>'
+    )
+
+
+@span("render_svg")
+def render_svg(payload: dict) -> str:
+    """Draw a chart_payload as a standalone SVG document."""
+    panels = []
+    if payload["kind"] == "components":
+        ds = payload["ds"]
+        for i, (name, values) in enumerate(payload["components"].items()):
+            scale = _Scale(ds, values, i * SVG_PANEL_HEIGHT)
+            panels.append(
+                _axis_labels(scale, name)
+                + f'<polyline points="{scale.points(ds, values)}" fill="none" stroke="#0072B2" stroke-width="2"/>'
+            )
+    else:
+        hist, fc = payload["history"], payload["forecast"]
+        scale = _Scale(fc["ds"] + hist["ds"], fc["yhat_lower"] + fc["yhat_upper"] + hist["y"], 0)
+        band = scale.points(fc["ds"], fc["yhat_upper"]) + " " + scale.points(fc["ds"][::-1], fc["yhat_lower"][::-1])
+        dots = "".join(f'<circle cx="{scale.x(x):.1f}" cy="{scale.y(y):.1f}" r="2.5"/>' for x, y in zip(hist["ds"], hist["y"]))
+        panels.append(
+            _axis_labels(scale, "Forecast")
+            + f'<polygon points="{band}" fill="#0072B2" fill-opacity="0.2" stroke="none"/>'
+            + f'<polyline points="{scale.points(fc["ds"], fc["yhat"])}" fill="none" stroke="#0072B2" stroke-width="2"/>'
+            + dots
+        )
+    height = SVG_PANEL_HEIGHT * max(len(panels), 1)
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{SVG_WIDTH}" height="{height}" '
+        f'viewBox="0 0 {SVG_WIDTH} {height}" font-family="Arial, sans-serif" font-size="12">'
+        + "".join(panels) + "</svg>"
+    )
@@ -0,0 +1,291 @@
+import os
+import json
+import time
+import argparse
+from statistics import NormalDist
+import numpy as np
+import pandas as pd
+from metrics import span
+
+# Forecast models selectable per request. "prophet" fits Stan per series; the
+# others are closed-form NumPy models that fit a whole batch of series at once.
+BACKENDS = ("prophet", "holt_winters", "seasonal_naive")
+DEFAULT_BACKEND = os.getenv("FORECAST_BACKEND", "prophet")
+# Same coverage as Prophet's default interval_width, so bands are comparable
+INTERVAL_WIDTH = float(os.getenv("FORECAST_INTERVAL_WIDTH", "0.8"))
+# Season length by pandas frequency prefix
+SEASON_LENGTHS = {"D": 7, "W": 52, "M": 12, "Q": 4}
+HW_ALPHAS = np.array([0.1, 0.3, 0.5, 0.8])
+HW_BETAS = np.array([0.01, 0.1, 0.3])
+HW_GAMMAS = np.array([0.05, 0.2, 0.5])
+
+
+def validate_backend(backend: str) -> str:
+    backend = backend or DEFAULT_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown forecast backend {backend!r}; expected one of {', '.join(BACKENDS)}")
+    return backend
+
+
+def series_frequency(ds: pd.Series) -> str:
+    """Pandas frequency of a date column, defaulting to month starts (the shape of the sales data)."""
+    dates = pd.DatetimeIndex(ds.sort_values().unique())
+    freq = pd.infer_freq(dates) if len(dates) >= 3 else None
+    return freq or "MS"
+
+
+def season_length(freq: str) -> int:
+    return SEASON_LENGTHS.get(freq.lstrip("0123456789")[:1].upper(), 1)
+
+
+def future_dates(last, periods: int, freq: str) -> pd.DatetimeIndex:
+    return pd.date_range(start=last, periods=periods + 1, freq=freq)[1:]
+
+
+def observed_series(series: pd.DataFrame) -> pd.DataFrame:
+    """series with one row per date (duplicates summed), in date order; gaps stay gaps."""
+    y = series.groupby("ds", sort=True)["y"].sum()
+    return pd.DataFrame({"ds": pd.DatetimeIndex(y.index), "y": y.to_numpy(dtype=np.float64)})
+
+
+def is_contiguous(dates: pd.DatetimeIndex, freq: str) -> bool:
+    """Whether dates are every freq step from the first to the last, with none missing."""
+    if len(dates) < 2:
+        return True
+    grid = pd.date_range(dates[0], dates[-1], freq=freq)
+    return len(grid) == len(dates) and bool((grid == dates).all())
+
+
+def grid_batches(series_list, freq: str = None):
+    """
+    Group ds/y frames by their observed dates at freq (inferred per series
+    when omitted) and stack the series whose dates are identical. Yields
+    (freq, dates, contiguous, positions in series_list, (n, n_dates) matrix);
+    a series never shares a matrix with one observed on other dates.
+    """
+    groups = {}
+    for i, series in enumerate(series_list):
+        series_freq = freq or series_frequency(series["ds"])
+        observed = observed_series(series)
+        dates = pd.DatetimeIndex(observed["ds"])
+        group = groups.setdefault((series_freq, dates.asi8.tobytes()), (series_freq, dates, [], []))
+        group[2].append(i)
+        group[3].append(observed["y"].to_numpy())
+    for series_freq, dates, positions, rows in groups.values():
+        yield series_freq, dates, is_contiguous(dates, series_freq), positions, np.vstack(rows)
+
+
+def seasonal_naive_batch(Y: np.ndarray, periods: int, season: int) -> dict:
+    """
+    Repeat the last observed season. The h-step variance is sigma^2 * (k + 1)
+    with k the number of whole seasons before step h, sigma^2 from the
+    in-sample seasonal differences.
+    """
+    n = Y.shape[1]
+    m = season if n > season else 1
+    h = np.arange(periods)
+    yhat = Y[:, n - m + h % m]
+    fitted = Y.copy()
+    fitted[:, m:] = Y[:, :-m]
+    resid = Y[:, m:] - Y[:, :-m]
+    sigma2 = (resid ** 2).mean(axis=1) if resid.shape[1] else np.zeros(len(Y))
+    fitted_var = np.zeros_like(Y)
+    fitted_var[:, m:] = sigma2[:, None]
+    var = sigma2[:, None] * (h // m + 1)[None, :]
+    return {"fitted": fitted, "fitted_var": fitted_var, "yhat": yhat, "var": var, "params": {"season": m}}
+
+
+def _hw_initial(Y: np.ndarray, m: int):
+    n = Y.shape[1]
+    if m > 1:
+        level = Y[:, :m].mean(axis=1)
+        trend = ((Y[:, m:] - Y[:, :n - m]) / m).mean(axis=1)
+        seasonal = Y[:, :m] - level[:, None]
+    else:
+        level = Y[:, 0]
+        trend = (Y[:, -1] - Y[:, 0]) / max(n - 1, 1)
+        seasonal = np.zeros((len(Y), 1))
+    return level, trend, seasonal
+
+
+def _hw_run(Y, m, alpha, beta, gamma, level, trend, seasonal):
+    """
+    Additive Holt-Winters recursion over time, vectorized over the leading
+    axes (series x parameter grid). Returns final states, one-step fitted
+    values and the level+trend path.
+    """
+    n = Y.shape[-1]
+    level, trend, seasonal = level.copy(), trend.copy(), seasonal.copy()
+    fitted = np.empty(level.shape + (n,))
+    base = np.empty_like(fitted)
+    for t in range(n):
+        y = Y[..., t]
+        s = seasonal[..., t % m]
+        base[..., t] = level + trend
+        fitted[..., t] = level + trend + s
+        new_level = alpha * (y - s) + (1 - alpha) * (level + trend)
+        trend = beta * (new_level - level) + (1 - beta) * trend
+        seasonal[..., t % m] = gamma * (y - new_level) + (1 - gamma) * s
+        level = new_level
+    return level, trend, seasonal, fitted, base
+
+
+def holt_winters_batch(Y: np.ndarray, periods: int, season: int) -> dict:
+    """
+    Additive Holt-Winters for every row of Y. Smoothing parameters are picked
+    per series from a small grid by one-step squared error (the whole grid is
+    evaluated in one broadcast pass). Intervals use the analytic h-step
+    variance sigma^2 * (1 + sum_j c_j^2), c_j = alpha(1 + j beta) + gamma [j % m == 0].
+    """
+    S, n = Y.shape
+    if n < 3:
+        return seasonal_naive_batch(Y, periods, 1)
+    m = season if n > season else 1
+    grid = np.array(np.meshgrid(HW_ALPHAS, HW_BETAS, HW_GAMMAS if m > 1 else [0.0], indexing="ij")).reshape(3, -1)
+    level, trend, seasonal = _hw_initial(Y, m)
+
+    alpha, beta, gamma = (g[None, :] for g in grid)
+    _, _, _, fitted, _ = _hw_run(
+        Y[:, None, :], m, alpha, beta, gamma,
+        np.repeat(level[:, None], grid.shape[1], 1),
+        np.repeat(trend[:, None], grid.shape[1], 1),
+        np.repeat(seasonal[:, None, :], grid.shape[1], 1),
+    )
+    best = ((Y[:, None, :] - fitted) ** 2).sum(axis=2).argmin(axis=1)
+    alpha, beta, gamma = grid[:, best]
+
+    level, trend, seasonal, fitted, base = _hw_run(Y, m, alpha, beta, gamma, level, trend, seasonal)
+    resid = Y - fitted
+    sigma2 = (resid ** 2).sum(axis=1) / max(n - 3, 1)
+
+    h = np.arange(1, periods + 1)
+    trend_path = level[:, None] + h[None, :] * trend[:, None]
+    season_path = seasonal[:, (n + h - 1) % m]
+    j = np.arange(1, periods)
+    c = alpha[:, None] * (1 + j[None, :] * beta[:, None]) + gamma[:, None] * (j % m == 0)[None, :]
+    var = sigma2[:, None] * (1 + np.concatenate([np.zeros((S, 1)), np.cumsum(c ** 2, axis=1)], axis=1))
+    return {
+        "fitted": fitted,
+        "fitted_var": np.repeat(sigma2[:, None], n, 1),
+        "yhat": trend_path + season_path,
+        "var": var,
+        "trend": np.concatenate([base, trend_path], axis=1),
+        "yearly": np.concatenate([fitted - base, season_path], axis=1) if m > 1 else None,
+        "params": {"season": m, "alpha": alpha, "beta": beta, "gamma": gamma},
+    }
+
+
+BATCH_MODELS = {"holt_winters": holt_winters_batch, "seasonal_naive": seasonal_naive_batch}
+
+
+@span("batch_forecast")
+def batch_forecast(series_list, periods: int, backend: str, freq: str = None):
+    """
+    Fit a NumPy backend to many ds/y series, one batched pass per group of
+    series observed on the same dates (see grid_batches). Returns one (model,
+    forecast) pair per series, where forecast has Prophet's layout: fitted
+    rows at the series' observed dates followed by periods future rows at
+    freq (inferred per series when omitted) with ds/yhat/yhat_lower/
+    yhat_upper (plus trend/yearly where the model has them). A series'
+    forecast never depends on the other series in the call.
+
+    Missing periods are never filled in: they are not zero sales (the sales
+    data only covers part of each year). A series with gaps is fitted on its
+    observed points in order, without a seasonal cycle, which its gaps break.
+    """
+    out = [None] * len(series_list)
+    z = NormalDist().inv_cdf(0.5 + INTERVAL_WIDTH / 2)
+    for series_freq, dates, contiguous, positions, Y in grid_batches(series_list, freq):
+        season = season_length(series_freq) if contiguous else 1
+        result = BATCH_MODELS[backend](Y, periods, season)
+        ds = dates.append(future_dates(dates[-1], periods, series_freq))
+        yhat = np.concatenate([result["fitted"], result["yhat"]], axis=1)
+        width = z * np.sqrt(np.concatenate([result["fitted_var"], result["var"]], axis=1))
+        components = [c for c in ("trend", "yearly") if result.get(c) is not None]
+        for row, i in enumerate(positions):
+            forecast = pd.DataFrame({
+                "ds": ds, "yhat": yhat[row], "yhat_lower": yhat[row] - width[row], "yhat_upper": yhat[row] + width[row],
+                **{c: result[c][row] for c in components},
+            })
+            model = {"backend": backend, "freq": series_freq, **{
+                k: (v[row].item() if isinstance(v, np.ndarray) else v) for k, v in result["params"].items()
+            }}
+            out[i] = (model, forecast)
+    return out
+
+
+def _backtest_metrics(actual: np.ndarray, forecast: pd.DataFrame) -> dict:
+    yhat = forecast["yhat"].to_numpy()
+    err = actual - yhat
+    denom = np.abs(actual) + np.abs(yhat)
+    return {
+        "mae": float(np.abs(err).mean()),
+        "rmse": float(np.sqrt((err ** 2).mean())),
+        "smape": float(np.mean(np.where(denom > 0, 2 * np.abs(err) / np.where(denom > 0, denom, 1), 0))),
+        "coverage": float(np.mean((actual >= forecast["yhat_lower"].to_numpy()) & (actual <= forecast["yhat_upper"].to_numpy()))),
+    }
+
+
+def compare_backends(df: pd.DataFrame, group_cols, horizon: int = 3, backends=BACKENDS) -> dict:
+    """
+    Accuracy/latency report: hold out the last horizon observed dates of
+    every (group column, value) segment, fit each backend on the rest and
+    score the held-out points. Every backend trains on the observed points
+    only, as in production, and is scored at the held-out dates themselves.
+    Metrics are averaged over segments.
+    """
+    from utils import filter_sales_data
+    segments = []
+    for col in group_cols:
+        for val in df[col].dropna().unique():
+            series = filter_sales_data(df, {col: [val]})
+            series = observed_series(series)
+            if len(series) > horizon + 2:
+                segments.append((col, str(val), series))
+    trains = [series.iloc[:-horizon] for _, _, series in segments]
+    actuals = [series["y"].to_numpy(dtype=np.float64)[-horizon:] for _, _, series in segments]
+    report = {"segments": len(segments), "horizon": horizon, "backends": {}}
+    for backend in backends:
+        start = time.perf_counter()
+        if backend == "prophet":
+            from prophet import Prophet
+            forecasts = []
+            for (_, _, series), train in zip(segments, trains):
+                model = Prophet().fit(train)
+                forecasts.append(model.predict(series[["ds"]].iloc[-horizon:]))
+        else:
+            # Held-out dates can lie beyond a gap: forecast far enough to reach them, then pick them out
+            held_out = [pd.DatetimeIndex(series["ds"].iloc[-horizon:]) for _, _, series in segments]
+            steps = max(
+                len(pd.date_range(train["ds"].iloc[-1], dates[-1], freq=series_frequency(train["ds"]))) - 1
+                for train, dates in zip(trains, held_out)
+            )
+            forecasts = [
+                forecast.set_index("ds").reindex(dates).reset_index(names="ds")
+                for (_, forecast), dates in zip(batch_forecast(trains, max(steps, horizon), backend), held_out)
+            ]
+        elapsed = time.perf_counter() - start
+        scores = [_backtest_metrics(a, f) for a, f in zip(actuals, forecasts)]
+        report["backends"][backend] = {
+            "seconds": elapsed,
+            "ms_per_series": 1000 * elapsed / max(len(segments), 1),
+            **{k: float(np.mean([s[k] for s in scores])) if scores else None for k in ("mae", "rmse", "smape", "coverage")},
+        }
+    return report
+
+
+if __name__ == "__main__":
+    from utils import load_data, CATEGORY_COLUMNS
+    parser = argparse.ArgumentParser(description="Compare forecast backends on held-out months of every segment.")
+    parser.add_argument("--groups", nargs="+", default=CATEGORY_COLUMNS)
+    parser.add_argument("--horizon", type=int, default=3)
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=BACKENDS)
+    parser.add_argument("--output", help="Write the JSON report to this file instead of stdout")
+    args = parser.parse_args()
+    report = compare_backends(load_data(), args.groups, args.horizon, args.backends)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    else:
+        print(text)
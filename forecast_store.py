@@ -0,0 +1,290 @@
+import os
+import time
+import fcntl
+import sqlite3
+import asyncio
+import threading
+import numpy as np
+import pandas as pd
+from utils import load_data, series_digest, normalize_filters, forecast_horizon, segment_series
+from forecast_backends import validate_backend
+import utils
+
+FORECAST_STORE_PATH = os.getenv("FORECAST_STORE_PATH", os.path.join(".data_cache", "forecast_store.sqlite3"))
+# Seconds between background refreshes; 0 disables the refresher
+FORECAST_STORE_INTERVAL = float(os.getenv("FORECAST_STORE_INTERVAL", "3600"))
+# Horizon precomputed for every segment; shorter requests are sliced from it
+FORECAST_STORE_PERIODS = int(os.getenv("FORECAST_STORE_PERIODS", "24"))
+FORECAST_STORE_PERIOD_TYPE = os.getenv("FORECAST_STORE_PERIOD_TYPE", "months")
+# Held by the one server worker that refreshes the store; the others only read it
+FORECAST_STORE_LOCK_PATH = os.getenv("FORECAST_STORE_LOCK_PATH", FORECAST_STORE_PATH + ".lock")
+# Bumped when stored forecasts change meaning; older tables are dropped
+SCHEMA_VERSION = 2
+
+FORECAST_COLUMNS = ["ds", "yhat", "yhat_lower", "yhat_upper"]
+
+
+def _pack(forecast_df: pd.DataFrame) -> bytes:
+    # One little-endian float64 matrix: epoch-ms dates followed by the three forecast columns
+    ms = forecast_df["ds"].to_numpy(dtype="datetime64[ms]").astype(np.int64)
+    values = forecast_df[FORECAST_COLUMNS[1:]].to_numpy(dtype=np.float64)
+    return np.column_stack([ms.astype(np.float64), values]).astype("<f8").tobytes()
+
+
+def _unpack(blob: bytes) -> pd.DataFrame:
+    matrix = np.frombuffer(blob, dtype="<f8").reshape(-1, len(FORECAST_COLUMNS))
+    frame = pd.DataFrame(matrix[:, 1:], columns=FORECAST_COLUMNS[1:])
+    frame.insert(0, "ds", pd.to_datetime(matrix[:, 0].astype(np.int64), unit="ms"))
+    return frame
+
+
+class ForecastStore:
+    """
+    Precomputed per-segment forecasts in SQLite, keyed by (group column,
+    value, frequency). Each entry holds the longest horizon computed so far
+    (in steps of its frequency) and records the digest of the series it was
+    fitted on, so lookups only return forecasts for unchanged data and the
+    refresher only refits segments whose source rows changed.
+    """
+
+    def __init__(self, path: str = FORECAST_STORE_PATH):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        if self._db.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+            # Version 1 stored daily-step forecasts per requested period count
+            self._db.execute("DROP TABLE IF EXISTS forecasts")
+            self._db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS forecasts ("
+            " group_col TEXT NOT NULL, value TEXT NOT NULL, freq TEXT NOT NULL, steps INTEGER NOT NULL,"
+            " series_digest TEXT NOT NULL, computed_at REAL NOT NULL, forecast BLOB NOT NULL,"
+            " PRIMARY KEY (group_col, value, freq))"
+        )
+        self._lock = threading.Lock()
+        self.last_refresh = {}
+
+    def get(self, col: str, val, freq: str, steps: int, digest: str):
+        """First steps rows of the stored forecast, if it covers them and was computed from a series with this digest."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT series_digest, steps, forecast FROM forecasts WHERE group_col = ? AND value = ? AND freq = ?",
+                (col, str(val), freq),
+            ).fetchone()
+        if row is None or row[0] != digest or row[1] < steps:
+            return None
+        return _unpack(row[2]).head(steps)
+
+    def digest(self, col: str, val, freq: str, steps: int = 0):
+        """Digest of the stored series, or None when nothing covering steps is stored."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT series_digest FROM forecasts WHERE group_col = ? AND value = ? AND freq = ? AND steps >= ?",
+                (col, str(val), freq, steps),
+            ).fetchone()
+        return row[0] if row else None
+
+    def put(self, col: str, val, freq: str, steps: int, digest: str, forecast_df: pd.DataFrame):
+        # A shorter forecast of the same series never replaces a longer one
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO forecasts VALUES (?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT (group_col, value, freq) DO UPDATE SET"
+                " steps = excluded.steps, series_digest = excluded.series_digest,"
+                " computed_at = excluded.computed_at, forecast = excluded.forecast"
+                " WHERE excluded.series_digest != forecasts.series_digest OR excluded.steps >= forecasts.steps",
+                (col, str(val), freq, steps, digest, time.time(), _pack(forecast_df)),
+            )
+
+    def entries(self) -> list:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT group_col, value, freq, steps, series_digest, computed_at FROM forecasts"
+                " ORDER BY group_col, value, freq"
+            ).fetchall()
+        return [
+            {"group": col, "value": val, "freq": freq, "steps": steps, "series_digest": digest, "computed_at": computed_at}
+            for col, val, freq, steps, digest, computed_at in rows
+        ]
+
+
+_forecast_store = None
+_forecast_store_lock = threading.Lock()
+
+
+def get_forecast_store() -> ForecastStore:
+    global _forecast_store
+    with _forecast_store_lock:
+        if _forecast_store is None:
+            _forecast_store = ForecastStore()
+        return _forecast_store
+
+
+def single_segment(filters: dict):
+    """(col, value) when filters select exactly one value of one column, else None."""
+    normalized = normalize_filters(filters)
+    if len(normalized) == 1:
+        col, values = next(iter(normalized.items()))
+        if len(values) == 1:
+            return col, values[0]
+    return None
+
+
+def lookup_forecast(series: pd.DataFrame, filters: dict, periods: int, backend: str = None, period_type: str = "days"):
+    """Stored (Prophet) forecast for a single-segment request over series, or None."""
+    segment = single_segment(filters)
+    if segment is None or validate_backend(backend) != "prophet":
+        return None
+    series, freq, steps = forecast_horizon(series, periods, period_type)
+    return get_forecast_store().get(*segment, freq, steps, series_digest(series))
+
+
+async def aforecast_segments(df: pd.DataFrame, segments, periods: int = 30, max_workers: int = None,
+                             return_exceptions: bool = False, backend: str = None, period_type: str = "days"):
+    """
+    utils.aforecast_segments backed by the store: segments with an up-to-date
+    stored forecast are yielded without fitting, and fresh fits are written
+    back so later requests can reuse them. The store holds Prophet forecasts;
+    other backends are cheap enough to compute directly.
+    """
+    if validate_backend(backend) != "prophet":
+        async for item in utils.aforecast_segments(df, segments, periods, max_workers, return_exceptions,
+                                                   backend, period_type):
+            yield item
+        return
+    store = get_forecast_store()
+    # Aggregating each segment and the SQLite reads and writes stay off the event loop
+    jobs, hits, misses = await asyncio.to_thread(_stored_segments, store, df, segments, periods, period_type)
+    for col, val, stored in hits:
+        yield col, val, stored
+    async for col, val, forecast_df in utils.aforecast_segments(df, misses, periods, max_workers, return_exceptions,
+                                                                backend, period_type):
+        if not isinstance(forecast_df, Exception):
+            await asyncio.to_thread(store.put, col, val, *jobs[(col, val)], forecast_df)
+        yield col, val, forecast_df
+
+
+def _stored_segments(store: ForecastStore, df: pd.DataFrame, segments, periods: int, period_type: str):
+    # ({segment: (freq, steps, digest)}, [(col, val, stored forecast)], segments to fit)
+    jobs = {}
+    hits = []
+    misses = []
+    for col, val in segments:
+        job = segment_series(df, col, val, periods, period_type)
+        if job is None:
+            continue
+        series, freq, steps = job
+        jobs[(col, val)] = (freq, steps, series_digest(series))
+        stored = store.get(col, val, freq, steps, jobs[(col, val)][2])
+        if stored is not None:
+            hits.append((col, val, stored))
+        else:
+            misses.append((col, val))
+    return jobs, hits, misses
+
+
+def _changed_segments(store: ForecastStore, df: pd.DataFrame, group_cols, periods: int, period_type: str):
+    # (all segments, segments whose stored forecast is missing or was fitted on other data)
+    segments = [(col, val) for col in group_cols for val in df[col].dropna().unique()]
+    changed = []
+    for col, val in segments:
+        job = segment_series(df, col, val, periods, period_type)
+        if job is not None and store.digest(col, val, job[1], job[2]) != series_digest(job[0]):
+            changed.append((col, val))
+    return segments, changed
+
+
+async def refresh_forecast_store(group_cols, periods: int = FORECAST_STORE_PERIODS,
+                                 period_type: str = FORECAST_STORE_PERIOD_TYPE) -> dict:
+    """Recompute stored forecasts for every segment of group_cols whose series changed."""
+    store = get_forecast_store()
+    # Loading (a CSV parse on a cold start) and aggregating every segment stay off the event loop
+    df = await asyncio.to_thread(load_data)
+    started_at = time.time()
+    segments, changed = await asyncio.to_thread(_changed_segments, store, df, group_cols, periods, period_type)
+    run = {"started_at": started_at, "segments": len(segments), "recomputed": 0, "failed": 0}
+    async for col, val, forecast_df in aforecast_segments(df, changed, periods, return_exceptions=True,
+                                                          period_type=period_type):
+        if isinstance(forecast_df, Exception):
+            run["failed"] += 1
+            print(f"[Warning] Forecast store refresh failed for {col}={val}: {forecast_df}")
+        else:
+            run["recomputed"] += 1
+    run["finished_at"] = time.time()
+    store.last_refresh = run
+    return run
+
+
+_refresher_lock_file = None
+
+
+def refresher_owner() -> bool:
+    """
+    Whether this process refreshes the store: the first server worker to take
+    the cross-process lock keeps it for its lifetime, and another worker
+    takes over on its next check if that one exits.
+    """
+    global _refresher_lock_file
+    if _refresher_lock_file is None:
+        if os.path.dirname(FORECAST_STORE_LOCK_PATH):
+            os.makedirs(os.path.dirname(FORECAST_STORE_LOCK_PATH), exist_ok=True)
+        f = open(FORECAST_STORE_LOCK_PATH, "a")
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            f.close()
+            return False
+        _refresher_lock_file = f
+    return True
+
+
+async def run_forecast_store_refresher(group_cols, interval: float = FORECAST_STORE_INTERVAL):
+    """Background task: refresh the store now and then every interval seconds, in one worker only."""
+    if interval <= 0:
+        return
+    while True:
+        try:
+            if refresher_owner():
+                await refresh_forecast_store(group_cols)
+        except Exception as e:
+            print(f"[Warning] Forecast store refresh failed: {e}")
+        await asyncio.sleep(interval)
+
+
+# (dataset version, group columns, {(group, value, freq): digest}) of the last status check
+_status_digests = None
+
+
+def _current_digests(group_cols) -> dict:
+    # Digests of every segment's current series, recomputed only when the dataset version changes
+    global _status_digests
+    dataset = utils.get_dataset()
+    cached = _status_digests
+    if cached is not None and cached[0] == dataset.version and cached[1] == tuple(group_cols):
+        return cached[2]
+    df = dataset.df
+    current = {}
+    for col in group_cols:
+        for val in df[col].dropna().unique():
+            job = segment_series(df, col, val, FORECAST_STORE_PERIODS, FORECAST_STORE_PERIOD_TYPE)
+            if job is not None:
+                current[(col, str(val), job[1])] = series_digest(job[0])
+    _status_digests = (dataset.version, tuple(group_cols), current)
+    return current
+
+
+def store_status(group_cols) -> dict:
+    """Stored entries with their age and whether the underlying series has changed since."""
+    store = get_forecast_store()
+    current = _current_digests(group_cols)
+    now = time.time()
+    entries = []
+    for entry in store.entries():
+        digest = current.get((entry["group"], entry["value"], entry["freq"]))
+        entries.append({
+            **entry,
+            "age_seconds": now - entry["computed_at"],
+            "stale": digest is not None and digest != entry["series_digest"],
+        })
+    return {"last_refresh": store.last_refresh, "entries": entries}
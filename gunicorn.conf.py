@@ -0,0 +1,29 @@
+# Multi-worker deployment:
+#
+#     gunicorn -c gunicorn.conf.py main:app
+#
+# The master imports the app and the heavy model libraries once before forking
+# (preload_app), so workers start without re-importing them and share those
+# pages copy-on-write. Each worker then runs the app's lifespan: background
+# warmup, data watcher and its own forecast pool, sized so that all workers'
+# pools together use one process per CPU. Only one worker (whichever holds
+# the forecast store lock) runs the store refresher. Set SHARED_DATA_DIR to
+# share the dataset itself between workers (see shared_data.py).
+import os
+import multiprocessing
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", "0")) or multiprocessing.cpu_count()
+# Read by utils at import, which preload_app does after this file runs
+os.environ.setdefault("FORECAST_WORKERS", str(max(1, multiprocessing.cpu_count() // workers)))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+# GenAI fan-outs over every segment can take minutes
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "300"))
+graceful_timeout = 30
+
+
+def on_starting(server):
+    from startup import preload
+    timings = preload()
+    server.log.info("Preloaded %s", ", ".join(f"{name} ({seconds:.2f}s)" for name, seconds in timings.items()))
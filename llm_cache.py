@@ -0,0 +1,168 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from metrics import REGISTRY
+
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join(".data_cache", "llm_cache.sqlite3"))
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+LLM_CACHE_MEMORY_ENTRIES = int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", "512"))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "20000"))
+# Memory-tier hits update accessed_at on disk in batches of this many, or every LLM_CACHE_TOUCH_SECONDS
+LLM_CACHE_TOUCH_BATCH = int(os.getenv("LLM_CACHE_TOUCH_BATCH", "64"))
+LLM_CACHE_TOUCH_SECONDS = float(os.getenv("LLM_CACHE_TOUCH_SECONDS", "5"))
+
+
+def estimate_tokens(text: str) -> int:
+    # Rough rule of thumb for English text: ~4 characters per token
+    return max(1, len(text) // 4)
+
+
+class LLMResponseCache:
+    """
+    Two-tier cache of LLM response text keyed by a hash of the model name and
+    the exact prompt: an in-memory LRU in front of a SQLite table. Entries
+    expire after ttl seconds and the table is trimmed to max_entries by least
+    recent access. Hits served from memory record their access time too, in
+    batches that are always flushed before the table is trimmed.
+    """
+
+    def __init__(self, path: str = LLM_CACHE_PATH, ttl: float = LLM_CACHE_TTL,
+                 memory_entries: int = LLM_CACHE_MEMORY_ENTRIES, max_entries: int = LLM_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.memory_entries = memory_entries
+        self.max_entries = max_entries
+        self._memory = OrderedDict()
+        # key -> access time of memory hits not yet written to disk
+        self._touched = {}
+        self._touched_flushed = time.monotonic()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "memory_hits": 0, "misses": 0, "tokens_saved": 0, "evictions": 0}
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, response TEXT NOT NULL, tokens INTEGER NOT NULL,"
+            " created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)")
+
+    @staticmethod
+    def key(model: str, prompt: str) -> str:
+        return hashlib.sha256(json.dumps([model, prompt]).encode()).hexdigest()
+
+    def get(self, key: str):
+        """Cached response text for key, or None when missing or expired."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and now - entry[2] < self.ttl:
+                self._memory.move_to_end(key)
+                self._stats["hits"] += 1
+                self._stats["memory_hits"] += 1
+                self._stats["tokens_saved"] += entry[1]
+                self._touch(key, now)
+                return entry[0]
+            row = self._db.execute(
+                "SELECT response, tokens, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[2] >= self.ttl:
+                self._memory.pop(key, None)
+                self._stats["misses"] += 1
+                return None
+            self._db.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            self._remember(key, row)
+            self._stats["hits"] += 1
+            self._stats["tokens_saved"] += row[1]
+            return row[0]
+
+    def put(self, key: str, response: str, tokens: int):
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, response, tokens, created_at, accessed_at)"
+                " VALUES (?, ?, ?, ?, ?)", (key, response, tokens, now, now)
+            )
+            self._touched.pop(key, None)
+            self._remember(key, (response, tokens, now))
+            self._flush_touches()
+            self._evict(now)
+
+    def _touch(self, key: str, now: float):
+        self._touched[key] = now
+        if (len(self._touched) >= LLM_CACHE_TOUCH_BATCH
+                or time.monotonic() - self._touched_flushed >= LLM_CACHE_TOUCH_SECONDS):
+            self._flush_touches()
+
+    def _flush_touches(self):
+        self._touched_flushed = time.monotonic()
+        if not self._touched:
+            return
+        touched = [(now, key) for key, now in self._touched.items()]
+        self._touched.clear()
+        self._db.executemany(
+            "UPDATE responses SET accessed_at = MAX(accessed_at, ?) WHERE key = ?", touched)
+
+    def _remember(self, key, entry):
+        self._memory[key] = tuple(entry)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _evict(self, now: float):
+        expired = self._db.execute("DELETE FROM responses WHERE created_at <= ?", (now - self.ttl,)).rowcount
+        overflow = self._db.execute(
+            "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY accessed_at DESC"
+            " LIMIT -1 OFFSET ?)", (self.max_entries,)
+        ).rowcount
+        self._stats["evictions"] += max(expired, 0) + max(overflow, 0)
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._touched.clear()
+            self._db.execute("DELETE FROM responses")
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            entries = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            return {
+                **self._stats,
+                "hit_ratio": self._stats["hits"] / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "disk_entries": entries,
+            }
+
+
+_llm_cache = None
+_llm_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> LLMResponseCache:
+    global _llm_cache
+    with _llm_cache_lock:
+        if _llm_cache is None:
+            _llm_cache = LLMResponseCache()
+        return _llm_cache
+
+
+def _llm_cache_metrics():
+    if _llm_cache is None:
+        return []
+    stats = _llm_cache.stats()
+    return [
+        ("llm_cache_lookups_total", "counter", "LLM response cache lookups by result.",
+         [({"result": "hit"}, stats["hits"]), ({"result": "miss"}, stats["misses"])]),
+        ("llm_cache_tokens_saved_total", "counter", "Tokens not spent because a cached response was served.",
+         [({}, stats["tokens_saved"])]),
+        ("llm_cache_entries", "gauge", "Responses stored on disk.", [({}, stats["disk_entries"])]),
+    ]
+
+
+REGISTRY.add_collector(_llm_cache_metrics)
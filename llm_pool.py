@@ -0,0 +1,174 @@
+import os
+import asyncio
+import threading
+from contextlib import asynccontextmanager
+from metrics import REGISTRY, Counter, span
+
+LLM_CALLS = Counter("llm_calls_total", "Chat completion calls by outcome (ok, error, cancelled).", ["outcome"])
+LLM_TOKENS = Counter(
+    "llm_tokens_total", "Tokens used by chat completions; estimated when the response has no usage.", ["kind"])
+
+LLM_MODEL = os.getenv("LLM_MODEL", "gemini-1.5-flash")
+# HTTP connection pool shared by every GenAI request
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+LLM_MAX_KEEPALIVE = int(os.getenv("LLM_MAX_KEEPALIVE", "10"))
+LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "30"))
+
+
+def build_chat_client(max_connections: int = LLM_MAX_CONNECTIONS, max_keepalive: int = LLM_MAX_KEEPALIVE,
+                      keepalive_expiry: float = LLM_KEEPALIVE_EXPIRY):
+    api_key = os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        raise RuntimeError("GEMINI_API_KEY is not set; export it to use the GenAI endpoints")
+    import httpx
+    from autogen_ext.models.openai import OpenAIChatCompletionClient
+    http_client = httpx.AsyncClient(limits=httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=max_keepalive,
+        keepalive_expiry=keepalive_expiry,
+    ))
+    return OpenAIChatCompletionClient(
+        model=LLM_MODEL,
+        api_key=api_key,
+        http_client=http_client,
+    )
+
+
+class ChatClientPool:
+    """
+    One chat client over a shared keep-alive connection pool, so HTTP
+    connections and TLS sessions are reused across requests. create() has the
+    chat client's signature; calls beyond max_connections wait for a free slot
+    and are counted as queued until they start. Without a client, the real
+    one is built on first use, so starting the app needs no LLM configuration.
+    """
+
+    def __init__(self, client=None, max_connections: int = LLM_MAX_CONNECTIONS):
+        self._client = client
+        self._client_lock = threading.Lock()
+        self.max_connections = max_connections
+        self._slots = asyncio.Semaphore(max_connections)
+        self.in_flight = 0
+        self.queued = 0
+        self.completed = 0
+        self.failed = 0
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = build_chat_client(max_connections=self.max_connections)
+        return self._client
+
+    @client.setter
+    def client(self, client):
+        self._client = client
+
+    @property
+    def model(self) -> str:
+        return getattr(self._client, "model", LLM_MODEL)
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold one connection slot; callers can time send() without counting the wait for it."""
+        self.queued += 1
+        try:
+            with span("llm_pool_wait"):
+                await self._slots.acquire()
+        finally:
+            self.queued -= 1
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._slots.release()
+
+    async def send(self, messages, **kwargs):
+        """One call on the underlying client; the caller holds a slot()."""
+        try:
+            with span("llm_call"):
+                response = await self.client.create(messages, **kwargs)
+        except asyncio.CancelledError:
+            # Includes timeouts: wait_for cancels the call
+            self.failed += 1
+            LLM_CALLS.inc(outcome="cancelled")
+            raise
+        except BaseException:
+            self.failed += 1
+            LLM_CALLS.inc(outcome="error")
+            raise
+        self.completed += 1
+        LLM_CALLS.inc(outcome="ok")
+        _count_tokens(response, messages)
+        return response
+
+    async def create(self, messages, **kwargs):
+        async with self.slot():
+            return await self.send(messages, **kwargs)
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "completed": self.completed,
+            "failed": self.failed,
+            "max_connections": self.max_connections,
+        }
+
+    async def close(self):
+        close = getattr(self._client, "close", None)
+        if close is not None:
+            await close()
+
+
+def _count_tokens(response, messages):
+    usage = getattr(response, "usage", None)
+    prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+    completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+    if prompt_tokens or completion_tokens:
+        LLM_TOKENS.inc(prompt_tokens, kind="prompt")
+        LLM_TOKENS.inc(completion_tokens, kind="completion")
+        return
+    from llm_cache import estimate_tokens
+    text = getattr(response, "content", None)
+    text = text if isinstance(text, str) else ""
+    LLM_TOKENS.inc(sum(estimate_tokens(str(m.content)) for m in messages) + estimate_tokens(text), kind="estimated")
+
+
+_chat_pool = None
+
+
+def _pool_metrics():
+    if _chat_pool is None:
+        return []
+    stats = _chat_pool.stats()
+    return [
+        ("llm_pool_in_flight", "gauge", "Chat completion calls in progress.", [({}, stats["in_flight"])]),
+        ("llm_pool_queued", "gauge", "Chat completion calls waiting for a connection slot.", [({}, stats["queued"])]),
+    ]
+
+
+REGISTRY.add_collector(_pool_metrics)
+
+
+def get_chat_pool() -> ChatClientPool:
+    """The process-wide pool; created on first use if the app has not started it."""
+    global _chat_pool
+    if _chat_pool is None:
+        _chat_pool = ChatClientPool()
+    return _chat_pool
+
+
+def start_chat_pool(client=None, max_connections: int = LLM_MAX_CONNECTIONS) -> ChatClientPool:
+    global _chat_pool
+    _chat_pool = ChatClientPool(client, max_connections)
+    return _chat_pool
+
+
+async def close_chat_pool():
+    global _chat_pool
+    if _chat_pool is not None:
+        pool, _chat_pool = _chat_pool, None
+        await pool.close()
@@ -1,21 +1,89 @@
 from fastapi import FastAPI, HTTPException
-from fastapi.responses import HTMLResponse, Response, RedirectResponse
+from fastapi.responses import HTMLResponse, Response, StreamingResponse, FileResponse, JSONResponse
 from pydantic import BaseModel
 from typing import Dict, List, Optional
-from utils import get_unique_filters, load_data
-from genai_insights import get_sales_insights_and_recommendations
+from utils import get_unique_filters, load_data, fit_cache_info, get_sales_cube, get_dataset
+from forecast_backends import DEFAULT_BACKEND, validate_backend
+from metrics import observe_request
 import pandas as pd
-import os
+import base64
+import json
 from fastapi import BackgroundTasks
 import asyncio
 from fastapi import Request
+from contextlib import asynccontextmanager
 
-app = FastAPI(title="Dynamic Sales Forecasting API")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    from llm_pool import start_chat_pool, close_chat_pool
+    from forecast_store import run_forecast_store_refresher
+    from utils import run_data_watcher
+    from startup import STARTUP_WARMUP, warmup, skip_warmup
+    # The LLM client is built on first use or by the warmup below
+    start_chat_pool()
+    # Load data, Prophet, the forecast pool and the LLM client while /healthz already answers
+    if STARTUP_WARMUP:
+        warming = asyncio.create_task(asyncio.to_thread(warmup))
+    else:
+        skip_warmup()
+    # Precompute forecasts for every segment the GenAI endpoints group by
+    refresher = asyncio.create_task(run_forecast_store_refresher(STORE_GROUP_COLS))
+    # Pick up rows appended to the sales CSV without a restart
+    watcher = asyncio.create_task(run_data_watcher(on_reload=refresh_store_after_reload))
+    yield
+    if STARTUP_WARMUP:
+        warming.cancel()
+    watcher.cancel()
+    refresher.cancel()
+    await close_chat_pool()
+    from utils import shutdown_forecast_pool
+    shutdown_forecast_pool()
+
+app = FastAPI(title="Dynamic Sales Forecasting API", lifespan=lifespan)
+# Request latency histograms, Server-Timing stage breakdowns and opt-in slow-request profiles
+app.middleware("http")(observe_request)
+
+async def refresh_store_after_reload(result: dict):
+    # Stored forecasts are digest-checked, so this refits only segments the new rows touched;
+    # every worker sees the reload, only the one running the refresher refits
+    from forecast_store import refresh_forecast_store, refresher_owner, FORECAST_STORE_INTERVAL
+    if FORECAST_STORE_INTERVAL > 0 and refresher_owner():
+        await refresh_forecast_store(STORE_GROUP_COLS)
+
+CONSOLIDATED_GROUP_COLS = ["Sales Head", "Regional Manager", "Product", "Region"]
+SUMMARY_GROUP_COLS = ["Product", "Region", "Sales office", "Sales Head"]
+STORE_GROUP_COLS = list(dict.fromkeys(CONSOLIDATED_GROUP_COLS + SUMMARY_GROUP_COLS))
 
 class ForecastRequest(BaseModel):
     filters: Optional[Dict[str, List[str]]] = None
     periods: Optional[int] = 30
-    period_type: Optional[str] = "days"  # new field
+    period_type: Optional[str] = "days"  # days | weeks | months | years
+    llm_cache: Optional[bool] = True  # False bypasses the GenAI response cache
+    render: Optional[str] = "json"  # json | svg | png (matplotlib export)
+    backend: Optional[str] = DEFAULT_BACKEND  # prophet | holt_winters | seasonal_naive
+
+RENDER_MODES = ("json", "svg", "png")
+
+def check_backend(backend: Optional[str]) -> str:
+    try:
+        return validate_backend(backend)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def check_period_type(period_type: Optional[str]) -> str:
+    from utils import validate_period_type
+    try:
+        return validate_period_type(period_type)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def check_periods(periods: Optional[int]) -> int:
+    from utils import validate_periods
+    try:
+        return validate_periods(periods)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @app.get("/filters")
 def filters():
@@ -23,92 +91,255 @@ def filters():
 
 @app.post("/forecast")
 def forecast(request: ForecastRequest):
-    from utils import filter_sales_data, forecast_sales
+    from utils import filter_sales_data, forecast_sales, forecast_horizon
+    from forecast_store import lookup_forecast
+    backend = check_backend(request.backend)
+    period_type = check_period_type(request.period_type)
+    periods = check_periods(request.periods)
     df = load_data()
     filtered_df = filter_sales_data(df, request.filters or {})
     if filtered_df.empty:
         raise HTTPException(status_code=404, detail="No data found for the given filters.")
-    # Optionally, you could add period_type info to the response
-    forecast_df = forecast_sales(filtered_df, request.periods)
-    return {"period_type": request.period_type, "periods": request.periods, "forecast": forecast_df.to_dict(orient="records")}
+    forecast_df = lookup_forecast(filtered_df, request.filters, periods, backend, period_type)
+    if forecast_df is None:
+        forecast_df = forecast_sales(filtered_df, periods, request.filters, backend, period_type)
+    # Rows are at freq: the requested period type, or the data's own frequency when that is coarser
+    _, freq, _ = forecast_horizon(filtered_df, periods, period_type)
+    return {"period_type": period_type, "periods": periods, "backend": backend, "freq": freq,
+            "forecast": forecast_df.to_dict(orient="records")}
 
-@app.post("/plot")
-def plot(request: ForecastRequest):
-    from utils import filter_sales_data, prophet_plot
+class BatchForecastRequest(BaseModel):
+    scenarios: List[ForecastRequest]
+    format: Optional[str] = "json"  # json | orjson | arrow
+
+BATCH_FORMATS = ("json", "orjson", "arrow")
+# The orjson fallback is reported once per process, not on every request
+_orjson_warned = False
+FORECAST_VALUE_COLUMNS = ["yhat", "yhat_lower", "yhat_upper"]
+
+def columnar_forecast(forecast_df: pd.DataFrame) -> dict:
+    # Epoch-ms dates plus one float array per column instead of per-row dicts
+    columns = {"ds": forecast_df["ds"].to_numpy(dtype="datetime64[ms]").astype("int64")}
+    for col in FORECAST_VALUE_COLUMNS:
+        columns[col] = forecast_df[col].to_numpy(dtype="float64")
+    return columns
+
+def arrow_response(results: list) -> Response:
+    # One long table; the scenario column indexes into the request's scenarios
+    import pyarrow as pa
+    frames = [
+        pd.DataFrame(columnar_forecast(df)).assign(scenario=i)
+        for i, df in enumerate(results) if isinstance(df, pd.DataFrame)
+    ]
+    table = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=["ds", *FORECAST_VALUE_COLUMNS, "scenario"])
+    table["ds"] = pd.to_datetime(table["ds"].astype("int64"), unit="ms")
+    sink = pa.BufferOutputStream()
+    arrow_table = pa.Table.from_pandas(table[["scenario", "ds", *FORECAST_VALUE_COLUMNS]], preserve_index=False)
+    with pa.ipc.new_stream(sink, arrow_table.schema) as writer:
+        writer.write_table(arrow_table)
+    errors = {str(i): str(r) for i, r in enumerate(results) if not isinstance(r, pd.DataFrame)}
+    return Response(content=sink.getvalue().to_pybytes(), media_type="application/vnd.apache.arrow.stream",
+                    headers={"X-Forecast-Errors": json.dumps(errors)} if errors else None)
+
+@app.post("/forecast/batch")
+async def forecast_batch(request: BatchForecastRequest):
+    """
+    Forecast a list of scenarios in one shared pass: identical series are fitted
+    once and results come back columnar, as JSON (orjson if installed) or an
+    Arrow IPC stream.
+    """
+    from utils import aforecast_scenarios
+    if request.format not in BATCH_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(BATCH_FORMATS)}")
+    scenarios = [
+        {"filters": s.filters, "periods": check_periods(s.periods), "period_type": check_period_type(s.period_type),
+         "backend": check_backend(s.backend)}
+        for s in request.scenarios
+    ]
+    df = await asyncio.to_thread(load_data)
+    forecasts = await aforecast_scenarios(df, scenarios)
+    results = [
+        "No data found for the given filters." if forecast_df is None else forecast_df
+        for forecast_df in forecasts
+    ]
+    if request.format == "arrow":
+        try:
+            return arrow_response(results)
+        except ImportError:
+            raise HTTPException(status_code=400, detail="Arrow encoding requires pyarrow")
+    payload = {"results": []}
+    for scenario, result in zip(scenarios, results):
+        item = {"periods": scenario["periods"], "period_type": scenario["period_type"], "backend": scenario["backend"]}
+        if isinstance(result, pd.DataFrame):
+            item["freq"] = result.attrs.get("freq")
+            item.update(columnar_forecast(result))
+        else:
+            item["error"] = str(result)
+        payload["results"].append(item)
+    if request.format == "orjson":
+        try:
+            import orjson
+            return Response(content=orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY), media_type="application/json")
+        except ImportError:
+            global _orjson_warned
+            if not _orjson_warned:
+                _orjson_warned = True
+                print("[Warning] orjson is not installed; falling back to json for /forecast/batch")
+    for item in payload["results"]:
+        for col in ["ds", *FORECAST_VALUE_COLUMNS]:
+            if col in item:
+                item[col] = item[col].tolist()
+    return payload
+
+def plot_response(entry: dict, key: str) -> dict:
+    from plot_store import get_plot_store
+    png = get_plot_store().read(entry["filename"])
+    return {key: base64.b64encode(png).decode(), "filename": entry["filename"], "url": f"/plot-img/{entry['filename']}"}
+
+def chart_response(request: ForecastRequest, kind: str, png_key: str):
+    from utils import filter_sales_data, prophet_plot, prophet_components
+    if request.render not in RENDER_MODES:
+        raise HTTPException(status_code=400, detail=f"render must be one of {', '.join(RENDER_MODES)}")
+    backend = check_backend(request.backend)
+    period_type = check_period_type(request.period_type)
+    periods = check_periods(request.periods)
     df = load_data()
     filtered_df = filter_sales_data(df, request.filters or {})
     if filtered_df.empty:
         raise HTTPException(status_code=404, detail="No data found for the given filters.")
-    plot_b64 = prophet_plot(filtered_df, request.periods)
-    return {"plot_base64": plot_b64}
+    if request.render == "png":
+        render = prophet_plot if kind == "plot" else prophet_components
+        return plot_response(render(filtered_df, periods, request.filters, backend, period_type), png_key)
+    from charts import chart_payload, render_svg
+    payload = chart_payload(filtered_df, periods, request.filters, kind, backend, period_type)
+    if request.render == "svg":
+        return Response(content=render_svg(payload), media_type="image/svg+xml")
+    return payload
+
+@app.post("/plot")
+def plot(request: ForecastRequest):
+    return chart_response(request, "plot", "plot_base64")
 
 @app.post("/components")
 def components(request: ForecastRequest):
-    from utils import filter_sales_data, prophet_components
-    df = load_data()
-    filtered_df = filter_sales_data(df, request.filters or {})
-    if filtered_df.empty:
-        raise HTTPException(status_code=404, detail="No data found for the given filters.")
-    comp_b64 = prophet_components(filtered_df, request.periods)
-    return {"components_base64": comp_b64}
+    return chart_response(request, "components", "components_base64")
+
+@app.get("/cache-stats")
+def cache_stats():
+    from llm_cache import get_llm_cache
+    return {
+        "dataset": get_dataset().info(),
+        "fit_cache": fit_cache_info(),
+        "sales_cube": get_sales_cube().memory_usage(),
+        "llm_cache": get_llm_cache().stats(),
+    }
+
+@app.get("/healthz")
+def healthz():
+    # Liveness: the process serves requests; never waits on data or models
+    return {"status": "ok"}
+
+@app.get("/readyz")
+def readyz():
+    # Readiness: 503 until the startup warmup has loaded the dataset
+    from startup import readiness
+    state = readiness()
+    return JSONResponse(state, status_code=200 if state["ready"] else 503)
+
+@app.get("/metrics")
+def metrics():
+    from metrics import render_metrics
+    return Response(content=render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/profiles")
+def profiles():
+    # Collapsed-stack dumps of slow requests, newest first (see PROFILE_SLOW_MS)
+    from metrics import list_profiles
+    return {"profiles": [f"/profiles/{name}" for name in list_profiles()]}
+
+@app.get("/profiles/{name}")
+def get_profile(name: str):
+    from metrics import profile_path
+    path = profile_path(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found.")
+    return FileResponse(path, media_type="text/plain")
+
+@app.post("/admin/reload")
+async def admin_reload(background_tasks: BackgroundTasks):
+    """Ingest rows appended to the sales CSV now instead of waiting for the watcher."""
+    from utils import reload_data
+    result = await asyncio.to_thread(reload_data)
+    if result["rows_added"]:
+        background_tasks.add_task(refresh_store_after_reload, result)
+    return result
+
+@app.get("/forecast-store")
+def forecast_store_status():
+    from forecast_store import store_status
+    return store_status(STORE_GROUP_COLS)
+
+@app.get("/llm-pool")
+def llm_pool_stats():
+    from llm_pool import get_chat_pool
+    return get_chat_pool().stats()
+
+# Plots are stored as PNG files; browsers may cache them for a day and revalidate by ETag
+PLOT_CACHE_CONTROL = "public, max-age=86400"
 
 @app.get("/plots")
-def get_saved_plots():
-    # List all saved plot files (base64)
-    plot_dir = "plots"
-    if not os.path.exists(plot_dir):
-        return []
-    files = [f for f in os.listdir(plot_dir) if f.endswith(".b64")]
-    plots = []
-    for fname in files:
-        with open(os.path.join(plot_dir, fname), "r") as f:
-            plots.append({"filename": fname, "base64": f.read()})
-    return plots
+def get_saved_plots(offset: int = 0, limit: int = 50):
+    # Paginated plot metadata; fetch the images themselves from each item's url
+    from plot_store import get_plot_store
+    page = get_plot_store().list(max(offset, 0), min(max(limit, 1), 500))
+    page["items"] = [{**item, "url": f"/plot-img/{item['filename']}"} for item in page["items"]]
+    return page
 
 @app.get("/all-plots", response_class=HTMLResponse)
-def all_plots():
-    plot_dir = "plots"
-    if not os.path.exists(plot_dir):
-        return "<h2>No plots found.</h2>"
-    files = [f for f in os.listdir(plot_dir) if f.endswith(".b64")]
-    if not files:
+def all_plots(offset: int = 0, limit: int = 50):
+    from plot_store import get_plot_store
+    page = get_plot_store().list(max(offset, 0), min(max(limit, 1), 500))
+    if not page["items"]:
         return "<h2>No plots found.</h2>"
     images_html = ""
-    for fname in files:
-        with open(os.path.join(plot_dir, fname), "r") as f:
-            b64 = f.read()
-            images_html += f'<div style="margin-bottom:2rem;"><h4>{fname}</h4><img src="data:image/png;base64,{b64}" style="max-width:100%;border:1px solid #ccc;" /></div>'
-    return f"<html><head><title>All Prophet Plots</title></head><body><h2>All Prophet Plots (base64, dpi=60)</h2>{images_html}</body></html>"
+    for item in page["items"]:
+        fname = item["filename"]
+        images_html += f'<div style="margin-bottom:2rem;"><h4>{fname}</h4><img src="/plot-img/{fname}" loading="lazy" style="max-width:100%;border:1px solid #ccc;" /></div>'
+    nav = f'<p>Showing {page["offset"] + 1}-{page["offset"] + len(page["items"])} of {page["total"]}'
+    if page["offset"] + len(page["items"]) < page["total"]:
+        nav += f' &middot; <a href="/all-plots?offset={page["offset"] + page["limit"]}&limit={page["limit"]}">next</a>'
+    nav += "</p>"
+    return f"<html><head><title>All Prophet Plots</title></head><body><h2>All Prophet Plots (dpi=60)</h2>{nav}{images_html}</body></html>"
 
 @app.get("/plot-img/{filename}")
-def get_plot_img(filename: str):
-    plot_dir = "plots"
-    file_path = os.path.join(plot_dir, filename)
-    if not os.path.exists(file_path):
+def get_plot_img(filename: str, request: Request):
+    from plot_store import get_plot_store
+    store = get_plot_store()
+    entry = store.get(filename)
+    if entry is None:
         return Response(status_code=404)
-    with open(file_path, "r") as f:
-        b64 = f.read()
-    return Response(content=b64, media_type="text/plain")
+    etag = f'"{entry["etag"]}"'
+    headers = {"ETag": etag, "Cache-Control": PLOT_CACHE_CONTROL}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    # FileResponse streams via sendfile where available and answers Range requests
+    return FileResponse(store.path(filename), media_type="image/png", headers=headers)
 
 @app.get("/all-plots-img", response_class=HTMLResponse)
 def all_plots_img():
-    plot_dir = "plots"
-    if not os.path.exists(plot_dir):
-        return "<h2>No plots found.</h2>"
-    files = [f for f in os.listdir(plot_dir) if f.endswith(".b64")]
+    from plot_store import get_plot_store
+    files = [item["filename"] for item in get_plot_store().list(0, 500)["items"]]
     if not files:
         return "<h2>No plots found.</h2>"
     images_html = ""
     for fname in files:
-        images_html += f'<div style="margin-bottom:2rem;"><h4>{fname}</h4><img src="/plot-img/{fname}" style="max-width:100%;border:1px solid #ccc;" /></div>'
+        images_html += f'<div style="margin-bottom:2rem;"><h4>{fname}</h4><img src="/plot-img/{fname}" loading="lazy" style="max-width:100%;border:1px solid #ccc;" /></div>'
     return f"<html><head><title>All Prophet Plots (Image Tag)</title></head><body><h2>All Prophet Plots (as images, dpi=60)</h2>{images_html}</body></html>"
 
 @app.get("/all-plots-img-tab")
 def all_plots_img_tab():
-    plot_dir = "plots"
-    if not os.path.exists(plot_dir):
-        return {"urls": []}
-    files = [f for f in os.listdir(plot_dir) if f.endswith(".b64")]
+    from plot_store import get_plot_store
+    files = [item["filename"] for item in get_plot_store().list(0, 500)["items"]]
     urls = [f"/plot-img-view/{fname}" for fname in files]
     # Return a simple HTML page with links that open each plot in a new tab
     links_html = "<h2>Open Prophet Plots in New Tabs</h2><ul>"
@@ -119,69 +350,97 @@ def all_plots_img_tab():
 
 @app.get("/plot-img-view/{filename}", response_class=HTMLResponse)
 def plot_img_view(filename: str):
-    plot_dir = "plots"
-    file_path = os.path.join(plot_dir, filename)
-    if not os.path.exists(file_path):
+    from plot_store import get_plot_store
+    if get_plot_store().get(filename) is None:
         return HTMLResponse("<h2>Plot not found.</h2>", status_code=404)
-    with open(file_path, "r") as f:
-        b64 = f.read()
     # Render just the image in a blank page
-    return f'<html><head><title>{filename}</title></head><body style="margin:0;"><img src="data:image/png;base64,{b64}" style="display:block;max-width:100vw;max-height:100vh;margin:auto;" /></body></html>'
+    return f'<html><head><title>{filename}</title></head><body style="margin:0;"><img src="/plot-img/{filename}" style="display:block;max-width:100vw;max-height:100vh;margin:auto;" /></body></html>'
 
 # --- GENAI ENDPOINTS REWRITE ---
-
-def run_async_genai(func, *args, **kwargs):
-    import asyncio
-    try:
-        return asyncio.run(func(*args, **kwargs))
-    except RuntimeError:
-        # If already in an event loop (e.g. Jupyter), create a new loop
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        result = loop.run_until_complete(func(*args, **kwargs))
-        loop.close()
-        return result
+# These are native async handlers: LLM calls are awaited on the server's event
+# loop (where the shared chat client pool lives) and Prophet fits run in the
+# forecast process pool, so one worker can serve many GenAI requests at once.
 
 @app.post("/genai-insights")
-def genai_insights_endpoint(request: ForecastRequest):
-    from utils import filter_sales_data, forecast_sales
+async def genai_insights_endpoint(request: ForecastRequest):
+    from utils import filter_sales_data, aforecast_sales
     from genai_insights import get_genai_single_insights
-    df = load_data()
-    filtered_df = filter_sales_data(df, request.filters or {})
+    backend = check_backend(request.backend)
+    period_type = check_period_type(request.period_type)
+    periods = check_periods(request.periods)
+    df = await asyncio.to_thread(load_data)
+    filtered_df = await asyncio.to_thread(filter_sales_data, df, request.filters or {})
     if filtered_df.empty:
         raise HTTPException(status_code=404, detail="No data found for the given filters.")
-    forecast_df = forecast_sales(filtered_df, request.periods)
+    forecast_df = await aforecast_sales(filtered_df, periods, request.filters, backend, period_type)
     forecast_data = forecast_df.to_dict(orient="records")
-    insights = run_async_genai(get_genai_single_insights, forecast_data, request.period_type)
+    insights = await get_genai_single_insights(forecast_data, period_type, use_cache=request.llm_cache)
     return insights
 
 @app.post("/genai-consolidated-insights")
-def genai_consolidated_insights(request: ForecastRequest):
-    from utils import filter_sales_data, forecast_sales
+async def genai_consolidated_insights(request: ForecastRequest):
     from genai_insights import get_genai_consolidated_insights
-    df = load_data()
-    group_cols = ["Sales Head", "Regional Manager", "Product", "Region"]
-    results = run_async_genai(get_genai_consolidated_insights, df, group_cols, request.periods, request.period_type)
+    df = await asyncio.to_thread(load_data)
+    group_cols = CONSOLIDATED_GROUP_COLS
+    results = await get_genai_consolidated_insights(df, group_cols, check_periods(request.periods), check_period_type(request.period_type),
+                                                    use_cache=request.llm_cache, backend=check_backend(request.backend))
     return results
 
 @app.get("/genai-forecast-summary-json")
-def genai_forecast_summary_json(periods: int = 30, period_type: str = "days"):
-    from utils import filter_sales_data, forecast_sales
+async def genai_forecast_summary_json(periods: int = 30, period_type: str = "days", llm_cache: bool = True):
     from genai_insights import get_genai_forecast_summary
-    df = load_data()
-    group_cols = ["Product", "Region", "Sales office", "Sales Head"]
-    summary = run_async_genai(get_genai_forecast_summary, df, group_cols, periods, period_type)
-    return {"insights_forecast": summary.get("insights_forecast", [])}
+    df = await asyncio.to_thread(load_data)
+    group_cols = SUMMARY_GROUP_COLS
+    summary = await get_genai_forecast_summary(df, group_cols, check_periods(periods), check_period_type(period_type), use_cache=llm_cache)
+    return {"insights_forecast": summary.get("insights_forecast", []), "errors": summary.get("errors", [])}
+
+def stream_segments(items, fmt: str = "ndjson"):
+    """Stream per-segment dicts from an async generator as NDJSON lines or Server-Sent Events."""
+    if fmt not in ("ndjson", "sse"):
+        raise HTTPException(status_code=400, detail="format must be 'ndjson' or 'sse'.")
+
+    async def safe_items():
+        try:
+            async for item in items:
+                yield item
+        except Exception as e:
+            # Headers are already sent; report the failure in-band
+            yield {"error": f"{type(e).__name__}: {e}"}
+
+    async def ndjson():
+        async for item in safe_items():
+            yield json.dumps(item, default=str) + "\n"
+
+    async def sse():
+        async for item in safe_items():
+            yield f"event: segment\ndata: {json.dumps(item, default=str)}\n\n"
+        yield "event: done\ndata: {}\n\n"
+
+    if fmt == "sse":
+        return StreamingResponse(sse(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+@app.post("/genai-consolidated-insights/stream")
+async def genai_consolidated_insights_stream(request: ForecastRequest, format: str = "ndjson"):
+    from genai_insights import iter_genai_consolidated_insights
+    df = await asyncio.to_thread(load_data)
+    items = iter_genai_consolidated_insights(df, CONSOLIDATED_GROUP_COLS, check_periods(request.periods), check_period_type(request.period_type),
+                                             use_cache=request.llm_cache, backend=check_backend(request.backend))
+    return stream_segments(items, format)
+
+@app.get("/genai-forecast-summary/stream")
+async def genai_forecast_summary_stream(periods: int = 30, period_type: str = "days", llm_cache: bool = True, format: str = "ndjson"):
+    from genai_insights import iter_genai_forecast_summary
+    df = await asyncio.to_thread(load_data)
+    items = iter_genai_forecast_summary(df, SUMMARY_GROUP_COLS, check_periods(periods), check_period_type(period_type), use_cache=llm_cache)
+    return stream_segments(items, format)
 
 @app.get("/genai-forecast-summary", response_class=HTMLResponse)
-def genai_forecast_summary(request: Request):
-    import requests
+async def genai_forecast_summary(request: Request):
     periods = int(request.query_params.get("periods", 30))
     period_type = request.query_params.get("period_type", "days")
-    url = f"http://localhost:8000/genai-forecast-summary-json?periods={periods}&period_type={period_type}"
     try:
-        resp = requests.get(url)
-        data = resp.json()
+        data = await genai_forecast_summary_json(periods, period_type)
     except Exception as e:
         return f"<h2>Error fetching summary: {e}</h2>"
     html = f"<h2>GenAI Forecast Summary ({periods} {period_type})</h2>"
@@ -194,22 +453,18 @@ def genai_forecast_summary(request: Request):
     return f"<html><head><title>GenAI Forecast Summary</title></head><body>{html}</body></html>"
 
 @app.get("/genai-recommendations-json")
-def genai_recommendations_json():
-    from utils import filter_sales_data, forecast_sales
+async def genai_recommendations_json(llm_cache: bool = True):
     from genai_insights import get_genai_forecast_summary
-    df = load_data()
-    group_cols = ["Product", "Region", "Sales office", "Sales Head"]
-    summary = run_async_genai(get_genai_forecast_summary, df, group_cols)
+    df = await asyncio.to_thread(load_data)
+    group_cols = SUMMARY_GROUP_COLS
+    summary = await get_genai_forecast_summary(df, group_cols, use_cache=llm_cache)
     # Only return recommendations
-    return {"recommendations": summary.get("recommendations", [])}
+    return {"recommendations": summary.get("recommendations", []), "errors": summary.get("errors", [])}
 
 @app.get("/genai-recommendations", response_class=HTMLResponse)
-def genai_recommendations():
-    import requests
-    url = "http://localhost:8000/genai-recommendations-json"
+async def genai_recommendations():
     try:
-        resp = requests.get(url)
-        data = resp.json()
+        data = await genai_recommendations_json()
     except Exception as e:
         return f"<h2>Error fetching recommendations: {e}</h2>"
     html = "<h2>GenAI Recommendations</h2><ul>"
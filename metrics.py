@@ -0,0 +1,306 @@
+"""
+Process-local instrumentation: counters, latency histograms and stage spans
+exported in the Prometheus text format, plus an opt-in sampling profiler that
+dumps collapsed stacks (flame graph input) for slow requests.
+
+Each server worker keeps its own registry; Prometheus should scrape workers
+individually or sum across them.
+"""
+import os
+import sys
+import time
+import bisect
+import random
+import threading
+import contextvars
+from collections import Counter as StackCounter, defaultdict
+from contextlib import contextmanager
+
+# Seconds; spans cube lookups (sub-ms) through Prophet fits and LLM fan-outs (minutes)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+# Requests slower than this (ms) get a profile dump; 0 leaves the profiler off
+# except for requests sent with an "X-Profile: 1" header
+PROFILE_SLOW_MS = float(os.getenv("PROFILE_SLOW_MS", "0"))
+# Fraction of requests sampled while PROFILE_SLOW_MS is set
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "1"))
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL_MS", "5")) / 1000
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(".data_cache", "profiles"))
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "100"))
+APP_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and not value.is_integer():
+        return repr(value)
+    return str(int(value))
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+        self.collectors = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+
+    def add_collector(self, collect):
+        """collect() returns [(name, type, help, [(labels dict, value), ...])] at scrape time."""
+        self.collectors.append(collect)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        for collect in self.collectors:
+            try:
+                families = collect()
+            except Exception as e:
+                print(f"[Warning] Metrics collector {getattr(collect, '__name__', collect)} failed: {e}")
+                continue
+            for name, kind, help_text, samples in families:
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_labels(labels, labels.values())} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labelnames=(), registry: Registry = REGISTRY):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = defaultdict(float)
+        self._lock = threading.Lock()
+        registry.register(self)
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(labels[n] for n in self.labelnames)
+        with self._lock:
+            self._values[key] += amount
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        with self._lock:
+            items = sorted(self._values.items())
+        if not items and not self.labelnames:
+            items = [((), 0)]
+        for key, value in items:
+            yield f"{self.name}{_labels(self.labelnames, key)} {_number(value)}"
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labelnames=(), buckets=DEFAULT_BUCKETS,
+                 registry: Registry = REGISTRY):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (+Inf last), sum]
+        self._series = {}
+        self._lock = threading.Lock()
+        registry.register(self)
+
+    def observe(self, value: float, **labels):
+        key = tuple(labels[n] for n in self.labelnames)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][i] += 1
+            series[1] += value
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            items = sorted((key, (list(counts), total)) for key, (counts, total) in self._series.items())
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="%s"' % _number(bound)
+                yield f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}"
+            yield f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}"
+
+
+STAGE_SECONDS = Histogram(
+    "sales_stage_duration_seconds", "Time spent in each processing stage (stages may nest).", ["stage"])
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "HTTP request latency until the response starts.", ["method", "route", "status"])
+PROFILES_WRITTEN = Counter("sales_profiles_written_total", "Slow-request profiles dumped to PROFILE_DIR.")
+
+# Per-request stage totals, set by observe_request for the Server-Timing header
+_request_stages = contextvars.ContextVar("request_stages", default=None)
+
+
+def record(stage: str, seconds: float):
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    stages = _request_stages.get()
+    if stages is not None:
+        stages[stage] += seconds
+
+
+@contextmanager
+def span(stage: str):
+    """Time a block (or, as a decorator, a sync function) as one stage observation."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - start)
+
+
+def render_metrics() -> str:
+    return REGISTRY.render()
+
+
+class SamplingProfiler:
+    """
+    Samples the stacks of every thread each interval seconds while at least
+    one profile is active, keeping only stacks that pass through this app's
+    code (idle pool threads and the bare event loop are dropped). All
+    concurrently running requests are sampled together, so a profile shows
+    what the process was doing while that request ran.
+    """
+
+    def __init__(self, interval: float = PROFILE_INTERVAL):
+        self.interval = interval
+        self._active = []
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self) -> StackCounter:
+        profile = StackCounter()
+        with self._lock:
+            self._active.append(profile)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+                self._thread.start()
+        return profile
+
+    def stop(self, profile: StackCounter):
+        with self._lock:
+            # Identity, not equality: Counters with the same samples compare equal
+            self._active = [p for p in self._active if p is not profile]
+
+    def _run(self):
+        me = threading.get_ident()
+        while True:
+            with self._lock:
+                if not self._active:
+                    self._thread = None
+                    return
+                active = list(self._active)
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = _collapse(frame)
+                if stack is not None:
+                    line = f"{names.get(ident, ident)};{stack}"
+                    for profile in active:
+                        profile[line] += 1
+            time.sleep(self.interval)
+
+
+def _collapse(frame):
+    frames = []
+    in_app = False
+    while frame is not None:
+        code = frame.f_code
+        in_app = in_app or (code.co_filename.startswith(APP_ROOT) and "site-packages" not in code.co_filename)
+        frames.append(f"{code.co_qualname} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(frames)) if in_app else None
+
+
+_profiler = SamplingProfiler()
+
+
+def write_profile(profile: StackCounter, label: str, elapsed_ms: float) -> str:
+    """Write profile as collapsed stacks (flamegraph.pl / speedscope input); returns the file name."""
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    slug = "".join(c if c.isalnum() else "_" for c in label).strip("_") or "request"
+    name = f"{time.strftime('%Y%m%dT%H%M%S')}-{slug}-{int(elapsed_ms)}ms-{random.randrange(16 ** 6):06x}.folded"
+    with open(os.path.join(PROFILE_DIR, name), "w") as f:
+        for stack, count in profile.most_common():
+            f.write(f"{stack} {count}\n")
+    PROFILES_WRITTEN.inc()
+    files = sorted(os.listdir(PROFILE_DIR))
+    for old in files[:-PROFILE_KEEP]:
+        try:
+            os.remove(os.path.join(PROFILE_DIR, old))
+        except OSError:
+            pass
+    return name
+
+
+def list_profiles() -> list:
+    try:
+        return sorted(os.listdir(PROFILE_DIR), reverse=True)
+    except OSError:
+        return []
+
+
+def profile_path(name: str):
+    """Path of a dumped profile, or None for unknown (or path-like) names."""
+    if os.path.basename(name) != name or not name.endswith(".folded"):
+        return None
+    path = os.path.join(PROFILE_DIR, name)
+    return path if os.path.isfile(path) else None
+
+
+async def observe_request(request, call_next):
+    """
+    HTTP middleware: records request latency by route template, adds a
+    Server-Timing header with this request's stage totals and, when
+    profiling applies, samples stacks and names the dump in X-Profile.
+    Streaming responses are measured until their headers are sent.
+    """
+    forced = request.headers.get("x-profile") == "1"
+    profile = None
+    if forced or (PROFILE_SLOW_MS > 0 and random.random() < PROFILE_SAMPLE_RATE):
+        profile = _profiler.start()
+    stages = defaultdict(float)
+    token = _request_stages.set(stages)
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        elapsed = time.perf_counter() - start
+        _request_stages.reset(token)
+        if profile is not None:
+            _profiler.stop(profile)
+        route = request.scope.get("route")
+        HTTP_REQUEST_SECONDS.observe(elapsed, method=request.method,
+                                     route=getattr(route, "path", "unmatched"), status=str(status))
+    if stages:
+        response.headers["Server-Timing"] = ", ".join(
+            f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in stages.items())
+    if profile is not None and (forced or elapsed * 1000 >= PROFILE_SLOW_MS):
+        name = write_profile(profile, f"{request.method} {request.url.path}", elapsed * 1000)
+        response.headers["X-Profile"] = f"/profiles/{name}"
+    return response
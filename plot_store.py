@@ -0,0 +1,195 @@
+import os
+import json
+import time
+import base64
+import sqlite3
+import hashlib
+import threading
+
+PLOT_DIR = os.getenv("PLOT_DIR", "plots")
+INDEX_NAME = "plots.sqlite3"
+# Index file of older versions, imported once into the SQLite index
+LEGACY_MANIFEST_NAME = "manifest.json"
+# Bounds on the plot directory: total PNG bytes and age of the newest use
+PLOT_STORE_MAX_BYTES = int(os.getenv("PLOT_STORE_MAX_BYTES", str(200 * 1024 * 1024)))
+PLOT_STORE_MAX_AGE = float(os.getenv("PLOT_STORE_MAX_AGE", str(30 * 24 * 3600)))
+# A plot's used_at is rewritten at most this often; lookups in between are read-only
+PLOT_STORE_TOUCH_SECONDS = float(os.getenv("PLOT_STORE_TOUCH_SECONDS", "300"))
+
+ENTRY_COLUMNS = ["filename", "kind", "periods", "size", "etag", "created_at", "used_at"]
+
+
+def plot_filename(kind: str, series_digest: str, steps: int, backend: str = "prophet", freq: str = "MS") -> str:
+    """Content-addressed name: identical series, horizon, frequency, kind and backend always map to the same file."""
+    key = hashlib.sha256(json.dumps([kind, series_digest, steps, freq, backend]).encode()).hexdigest()
+    return f"{kind}_{key[:32]}.png"
+
+
+class PlotStore:
+    """
+    Rendered plots kept as raw PNG files in one directory, indexed by a SQLite
+    table (filename -> kind, periods, size, etag, created_at, used_at) that
+    every server worker shares. Only files listed in the index are ever
+    served. Entries unused for max_age seconds are dropped, then least
+    recently used ones until the directory fits in max_bytes.
+    """
+
+    def __init__(self, directory: str = PLOT_DIR, max_bytes: int = PLOT_STORE_MAX_BYTES,
+                 max_age: float = PLOT_STORE_MAX_AGE, touch_interval: float = PLOT_STORE_TOUCH_SECONDS):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.touch_interval = touch_interval
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(directory, INDEX_NAME), check_same_thread=False,
+                                   isolation_level=None, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS plots ("
+            " filename TEXT PRIMARY KEY, kind TEXT NOT NULL, periods INTEGER, size INTEGER NOT NULL,"
+            " etag TEXT NOT NULL, created_at REAL NOT NULL, used_at REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS plots_used ON plots (used_at)")
+        # .b64 files already converted, so a conversion whose PNG was later evicted is not redone
+        self._db.execute("CREATE TABLE IF NOT EXISTS migrated (name TEXT PRIMARY KEY)")
+        self._import_manifest()
+        self.migrate_legacy()
+
+    def _import_manifest(self):
+        manifest = os.path.join(self.directory, LEGACY_MANIFEST_NAME)
+        try:
+            with open(manifest) as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR IGNORE INTO plots VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(e["filename"], e["kind"], e.get("periods"), e["size"], e["etag"], e["created_at"],
+                  e.get("used_at", e["created_at"])) for e in entries.values()],
+            )
+        try:
+            os.remove(manifest)
+        except FileNotFoundError:
+            pass
+
+    def path(self, filename: str) -> str:
+        return os.path.join(self.directory, filename)
+
+    def save(self, filename: str, png: bytes, kind: str, periods: int = None) -> dict:
+        now = time.time()
+        entry = {
+            "filename": filename,
+            "kind": kind,
+            "periods": periods,
+            "size": len(png),
+            "etag": hashlib.sha256(png).hexdigest()[:32],
+            "created_at": now,
+            "used_at": now,
+        }
+        tmp = f"{self.path(filename)}.tmp{os.getpid()}.{threading.get_ident()}"
+        with open(tmp, "wb") as f:
+            f.write(png)
+        os.replace(tmp, self.path(filename))
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO plots VALUES (?, ?, ?, ?, ?, ?, ?)",
+                             [entry[col] for col in ENTRY_COLUMNS])
+            self._evict(keep=filename)
+        return entry
+
+    def lookup(self, filename: str):
+        """Index entry for a previously rendered plot (marking it used), or None."""
+        entry = self.get(filename)
+        if entry is not None:
+            now = time.time()
+            if now - entry["used_at"] >= self.touch_interval:
+                with self._lock:
+                    self._db.execute("UPDATE plots SET used_at = ? WHERE filename = ?", (now, filename))
+                entry["used_at"] = now
+        return entry
+
+    def _evict(self, keep: str = None):
+        # Caller holds the lock; one transaction so concurrent workers agree on what was removed
+        now = time.time()
+        removed = []
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            rows = self._db.execute("SELECT filename, size, used_at FROM plots ORDER BY used_at").fetchall()
+            total = sum(size for _, size, _ in rows)
+            for filename, size, used_at in rows:
+                if filename == keep:
+                    continue
+                if now - used_at <= self.max_age and total <= self.max_bytes:
+                    break
+                total -= size
+                removed.append(filename)
+            self._db.executemany("DELETE FROM plots WHERE filename = ?", [(f,) for f in removed])
+            self._db.execute("COMMIT")
+        except BaseException:
+            self._db.execute("ROLLBACK")
+            raise
+        for filename in removed:
+            try:
+                os.remove(self.path(filename))
+            except FileNotFoundError:
+                pass
+
+    def get(self, filename: str):
+        with self._lock:
+            row = self._db.execute(
+                f"SELECT {', '.join(ENTRY_COLUMNS)} FROM plots WHERE filename = ?", (filename,)
+            ).fetchone()
+        if row is None or not os.path.exists(self.path(filename)):
+            return None
+        return dict(zip(ENTRY_COLUMNS, row))
+
+    def read(self, filename: str) -> bytes:
+        with open(self.path(filename), "rb") as f:
+            return f.read()
+
+    def list(self, offset: int = 0, limit: int = 50) -> dict:
+        """One page of index entries, newest first."""
+        with self._lock:
+            total = self._db.execute("SELECT COUNT(*) FROM plots").fetchone()[0]
+            rows = self._db.execute(
+                f"SELECT {', '.join(ENTRY_COLUMNS)} FROM plots ORDER BY created_at DESC, filename"
+                " LIMIT ? OFFSET ?", (limit, offset)
+            ).fetchall()
+        return {"total": total, "offset": offset, "limit": limit,
+                "items": [dict(zip(ENTRY_COLUMNS, row)) for row in rows]}
+
+    def migrate_legacy(self):
+        """
+        Convert base64 .b64 files written by older versions into PNG entries.
+        The .b64 files are left in place and converted only once.
+        """
+        with self._lock:
+            done = {name for (name,) in self._db.execute("SELECT name FROM migrated")}
+        for name in sorted(os.listdir(self.directory)):
+            if not name.endswith(".b64") or name in done:
+                continue
+            legacy = self.path(name)
+            try:
+                with open(legacy) as f:
+                    png = base64.b64decode(f.read())
+            except (OSError, ValueError) as e:
+                print(f"[Warning] Could not migrate plot {name}: {e}")
+                continue
+            kind, _, rest = name[:-len(".b64")].partition("_")
+            periods = rest.rsplit("_", 1)[-1]
+            self.save(name[:-len(".b64")] + ".png", png, kind, int(periods) if periods.isdigit() else None)
+            with self._lock:
+                self._db.execute("INSERT OR IGNORE INTO migrated VALUES (?)", (name,))
+
+
+_plot_store = None
+_plot_store_lock = threading.Lock()
+
+
+def get_plot_store() -> PlotStore:
+    global _plot_store
+    with _plot_store_lock:
+        if _plot_store is None:
+            _plot_store = PlotStore()
+        return _plot_store
@@ -0,0 +1,247 @@
+"""
+Dataset versions shared between server workers through memory-mapped files.
+
+With SHARED_DATA_DIR set (ideally somewhere on tmpfs such as /dev/shm), one
+worker at a time holds the loader lock, parses the sales data and publishes
+the version as plain .npy files: every frame column (categoricals as codes)
+plus the SalesCube arrays. Every worker, the loader included, then attaches
+to those files read-only with np.load(mmap_mode="r"), so the frame and cube
+live in the page cache once instead of once per worker.
+
+The CURRENT file names the published version and is replaced atomically.
+Each worker's data watcher calls sync_shared(): it attaches to versions other
+workers published and, when the CSV grew and nobody else is loading it,
+becomes the loader for that reload.
+"""
+import os
+import json
+import time
+import fcntl
+import shutil
+from contextlib import contextmanager
+import numpy as np
+import pandas as pd
+from utils import (
+    SHARED_DATA_DIR, Dataset, SalesCube, read_sales_data, get_dataset, clear_fit_cache,
+    invalidate_fit_cache, _reload_local, _install_dataset, _dataset_lock, _source_signature,
+)
+
+# Published versions kept on disk; older ones are removed once superseded
+SHARED_DATA_KEEP = int(os.getenv("SHARED_DATA_KEEP", "3"))
+CURRENT_FILE = "CURRENT"
+LOCK_FILE = "LOCK"
+
+
+def _version_dir(version: int) -> str:
+    return os.path.join(SHARED_DATA_DIR, f"v{version:06d}")
+
+
+@contextmanager
+def loader_lock(block: bool = True):
+    """Exclusive, cross-process loader lock; yields False if not block and it is taken."""
+    os.makedirs(SHARED_DATA_DIR, exist_ok=True)
+    with open(os.path.join(SHARED_DATA_DIR, LOCK_FILE), "a") as f:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | (0 if block else fcntl.LOCK_NB))
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _save(directory: str, name: str, values: np.ndarray) -> str:
+    np.save(os.path.join(directory, name), np.ascontiguousarray(values))
+    return name
+
+
+def _load(directory: str, name: str) -> np.ndarray:
+    path = os.path.join(directory, name)
+    try:
+        return np.load(path, mmap_mode="r")
+    except ValueError:
+        # Zero-length arrays cannot be mapped
+        return np.load(path)
+
+
+def publish(dataset: Dataset, path: str, base: Dataset = None, signature: dict = None) -> str:
+    """
+    Write dataset's columns and cube arrays as version files and point
+    CURRENT at them. base is the version dataset extends by appending rows,
+    which lets followers invalidate only the fits those rows touch.
+    signature is path's _source_signature taken before it was read.
+    Caller holds the loader lock.
+    """
+    signature = signature or _source_signature(path)
+    df = dataset.df
+    final = _version_dir(dataset.version)
+    tmp = f"{final}.tmp{os.getpid()}"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    columns = []
+    for i, col in enumerate(df.columns):
+        values = df[col]
+        if values.dtype.kind not in "biufmM":
+            values = values.astype("category")
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            columns.append({
+                "name": col,
+                "file": _save(tmp, f"col{i}.npy", values.array.codes),
+                "categories": [str(c) for c in values.cat.categories],
+            })
+        else:
+            columns.append({"name": col, "file": _save(tmp, f"col{i}.npy", values.to_numpy()), "categories": None})
+    keys, sums, dates = dataset.cube.state()
+    meta = {
+        "version": dataset.version,
+        "source": os.path.abspath(path),
+        "source_offset": dataset.source_offset,
+        "source_size": signature["size"],
+        "source_mtime_ns": signature["mtime_ns"],
+        "rows": len(df),
+        "published_at": time.time(),
+        "base_version": base.version if base is not None else None,
+        "base_rows": len(base.df) if base is not None else None,
+        "columns": columns,
+        "cube": {
+            "dims": dataset.cube.dims,
+            "columns": sorted(dataset.cube.columns),
+            "codes": {col: list(mapping) for col, mapping in dataset.cube.codes.items()},
+            "keys": _save(tmp, "cube_keys.npy", keys),
+            "sums": _save(tmp, "cube_sums.npy", sums),
+            "dates": _save(tmp, "cube_dates.npy", dates),
+        },
+    }
+    with open(os.path.join(tmp, "meta.json"), "w") as f:
+        json.dump(meta, f)
+    shutil.rmtree(final, ignore_errors=True)
+    os.replace(tmp, final)
+    current = os.path.join(SHARED_DATA_DIR, CURRENT_FILE)
+    with open(current + ".tmp", "w") as f:
+        f.write(os.path.basename(final))
+    os.replace(current + ".tmp", current)
+    _remove_old_versions(dataset.version)
+    return final
+
+
+def _remove_old_versions(current: int):
+    # Workers still mapping a removed version keep their pages until they let go
+    names = sorted(n for n in os.listdir(SHARED_DATA_DIR) if n.startswith("v") and ".tmp" not in n)
+    for name in names[:-SHARED_DATA_KEEP]:
+        if name != os.path.basename(_version_dir(current)):
+            shutil.rmtree(os.path.join(SHARED_DATA_DIR, name), ignore_errors=True)
+
+
+def published_meta(path: str = None, unchanged: bool = True):
+    """
+    Metadata of the version CURRENT points at, or None. With path, only a
+    version of that file, and with unchanged only one published from the
+    file as it is on disk now (same size and mtime), so a regenerated CSV
+    is never served from an older version.
+    """
+    try:
+        with open(os.path.join(SHARED_DATA_DIR, CURRENT_FILE)) as f:
+            name = f.read().strip()
+        with open(os.path.join(SHARED_DATA_DIR, name, "meta.json")) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if path is not None:
+        if meta["source"] != os.path.abspath(path):
+            return None
+        if unchanged:
+            signature = _source_signature(path)
+            if (meta.get("source_size"), meta.get("source_mtime_ns")) != (signature["size"], signature["mtime_ns"]):
+                return None
+    meta["dir"] = os.path.join(SHARED_DATA_DIR, name)
+    return meta
+
+
+def attach(meta: dict) -> Dataset:
+    """Map a published version read-only; no column or cube array is copied."""
+    directory = meta["dir"]
+    columns = {}
+    for spec in meta["columns"]:
+        values = _load(directory, spec["file"])
+        if spec["categories"] is not None:
+            values = pd.Categorical.from_codes(values, categories=spec["categories"], validate=False)
+        columns[spec["name"]] = pd.Series(values, copy=False)
+    df = pd.DataFrame(columns, copy=False)
+    df.attrs["source_offset"] = meta["source_offset"]
+    cube_meta = meta["cube"]
+    cube = SalesCube.from_state(
+        cube_meta["columns"], cube_meta["dims"], cube_meta["codes"],
+        _load(directory, cube_meta["keys"]), _load(directory, cube_meta["sums"]), _load(directory, cube_meta["dates"]),
+    )
+    dataset = Dataset(df, meta["version"], cube)
+    dataset.shared_path = directory
+    return dataset
+
+
+def load_shared(path: str) -> Dataset:
+    """Attach to the published version of path, loading and publishing it first if there is none."""
+    meta = published_meta(path)
+    if meta is None:
+        with loader_lock():
+            meta = published_meta(path)
+            if meta is None:
+                version = (published_meta() or {}).get("version", 0) + 1
+                signature = _source_signature(path)
+                publish(Dataset(read_sales_data(path), version), path, signature=signature)
+                # path may have changed again since; this version is still the newest
+                meta = published_meta(path, unchanged=False)
+    return attach(meta)
+
+
+def _follow(path: str):
+    """Attach to a version newer than this worker's, if one was published."""
+    # Rows may have been appended since it was published; the watcher reads them next
+    meta = published_meta(path, unchanged=False)
+    current = get_dataset()
+    if meta is None or meta["version"] <= current.version:
+        return None
+    dataset = attach(meta)
+    with _dataset_lock:
+        _install_dataset(dataset)
+    if meta["base_version"] == current.version:
+        invalidated = invalidate_fit_cache(dataset.df.iloc[meta["base_rows"]:])
+    else:
+        clear_fit_cache()
+        invalidated = None
+    rows_added = len(dataset.df) - len(current.df)
+    return {**dataset.info(), "rows_added": rows_added, "full_reload": meta["base_version"] is None,
+            "fit_cache_invalidated": invalidated, "loader": False}
+
+
+def sync_shared(path: str, block: bool = False):
+    """
+    One coordination step for this worker. Attaches to any newer published
+    version; then, if path has grown past it and the loader lock can be taken
+    (waiting for it when block), reloads path, publishes the new version and
+    swaps this worker onto the mapped copy. Returns a reload_data()-style
+    dict, with loader telling whether this worker published, or None when
+    nothing changed.
+    """
+    result = _follow(path)
+    if os.path.getsize(path) == get_dataset().source_offset:
+        return result
+    with loader_lock(block) as acquired:
+        if not acquired:
+            return result
+        # Another worker may have published while we waited for the lock
+        result = _follow(path) or result
+        base = get_dataset()
+        if os.path.getsize(path) == base.source_offset:
+            return result
+        signature = _source_signature(path)
+        reloaded = _reload_local(path)
+        if not reloaded["rows_added"]:
+            return result
+        dataset = get_dataset()
+        publish(dataset, path, None if reloaded["full_reload"] else base, signature)
+        attached = attach(published_meta(path, unchanged=False))
+        with _dataset_lock:
+            _install_dataset(attached)
+    return {**reloaded, **attached.info(), "loader": True}
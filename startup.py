@@ -0,0 +1,177 @@
+"""
+Startup sequencing for the API.
+
+- preload(): heavy imports done once in a pre-fork master (see gunicorn.conf.py)
+  so workers inherit them instead of importing them each.
+- warmup(): run in the background by the app's lifespan; loads the dataset,
+  Prophet, the forecast worker pool, matplotlib and the LLM client while the
+  server already answers /healthz. /readyz reports readiness().
+- Import-time profile:
+
+    python -m startup --profile [--warmup] [--output startup.json]
+"""
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import threading
+import subprocess
+from metrics import record
+
+# 0 skips the background warmup; everything then loads on first use
+STARTUP_WARMUP = int(os.getenv("STARTUP_WARMUP", "1"))
+# Imported by preload(); each takes 0.2-1s and none starts threads, so they are fork-safe
+PRELOAD_MODULES = ["prophet", "matplotlib.pyplot", "autogen_core.models", "autogen_ext.models.openai"]
+
+_state = {"started_at": time.time(), "warmup": "pending", "stages": {}, "errors": {}}
+_state_lock = threading.Lock()
+
+
+def preload(modules=PRELOAD_MODULES) -> dict:
+    """
+    Import modules (missing ones are skipped with a warning) and return the
+    seconds each took. Data is not loaded here: pyarrow's thread pools do not
+    survive fork; set SHARED_DATA_DIR to share the dataset between workers.
+    """
+    import importlib
+    timings = {}
+    for name in modules:
+        start = time.perf_counter()
+        try:
+            importlib.import_module(name)
+        except ImportError as e:
+            print(f"[Warning] Could not preload {name}: {e}")
+            continue
+        timings[name] = time.perf_counter() - start
+    return timings
+
+
+def _warm_dataset():
+    from utils import get_dataset
+    get_dataset()
+
+
+def _warm_prophet():
+    from prophet import Prophet
+    # Constructing a model loads the compiled Stan backend
+    Prophet()
+
+
+def _warm_forecast_pool():
+    from utils import call_in_forecast_pool
+    # The first task starts the workers; each imports Prophet in its initializer
+    call_in_forecast_pool(int)
+
+
+def _warm_matplotlib():
+    import matplotlib.pyplot  # noqa: F401
+
+
+def _warm_llm_client():
+    from llm_pool import get_chat_pool
+    get_chat_pool().client
+
+
+# (stage, function, required for readiness); stages run in this order
+WARMUP_STAGES = [
+    ("dataset", _warm_dataset, True),
+    ("prophet", _warm_prophet, False),
+    ("forecast_pool", _warm_forecast_pool, False),
+    ("matplotlib", _warm_matplotlib, False),
+    ("llm_client", _warm_llm_client, False),
+]
+
+
+def warmup(stages=WARMUP_STAGES) -> dict:
+    """
+    Run every warmup stage, recording its duration (also as a
+    startup_<stage> metrics span) or its error. Optional stages that fail
+    only leave their feature to load, or fail, on first use.
+    """
+    with _state_lock:
+        _state["warmup"] = "running"
+    for name, warm, _ in stages:
+        start = time.perf_counter()
+        try:
+            warm()
+        except Exception as e:
+            print(f"[Warning] Warmup stage {name} failed: {e}")
+            with _state_lock:
+                _state["errors"][name] = f"{type(e).__name__}: {e}"
+            continue
+        elapsed = time.perf_counter() - start
+        record(f"startup_{name}", elapsed)
+        with _state_lock:
+            _state["stages"][name] = round(elapsed, 3)
+    with _state_lock:
+        _state["warmup"] = "done"
+    return readiness()
+
+
+def skip_warmup():
+    with _state_lock:
+        _state["warmup"] = "skipped"
+
+
+def readiness() -> dict:
+    """
+    Ready once warmup has finished with every required stage loaded, or
+    right away when warmup is disabled.
+    """
+    with _state_lock:
+        state = {**_state, "stages": dict(_state["stages"]), "errors": dict(_state["errors"])}
+    required_ok = all(name not in state["errors"] for name, _, required in WARMUP_STAGES if required)
+    state["ready"] = state["warmup"] == "skipped" or (state["warmup"] == "done" and required_ok)
+    state["uptime"] = round(time.time() - state.pop("started_at"), 3)
+    return state
+
+
+_IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def import_profile(module: str = "main", top: int = 25) -> dict:
+    """
+    Import module in a fresh interpreter under -X importtime and return the
+    total plus the top entries by cumulative time (microseconds -> ms).
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"importing {module} failed:\n{proc.stderr[-2000:]}")
+    entries = []
+    for line in proc.stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            entries.append({"module": name, "depth": len(indent) // 2, "self_ms": int(self_us) / 1000,
+                            "cumulative_ms": int(cumulative_us) / 1000})
+    total = next((e["cumulative_ms"] for e in entries if e["module"] == module and e["depth"] == 0), None)
+    entries.sort(key=lambda e: e["cumulative_ms"], reverse=True)
+    return {"module": module, "total_ms": total, "top": entries[:top]}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profile", action="store_true", help="Import-time breakdown of --module")
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--top", type=int, default=25)
+    parser.add_argument("--warmup", action="store_true", help="Also run and time the warmup stages in-process")
+    parser.add_argument("--output", help="Write the JSON report to this file instead of stdout")
+    args = parser.parse_args()
+    report = {}
+    if args.profile or not args.warmup:
+        report["imports"] = import_profile(args.module, args.top)
+    if args.warmup:
+        from utils import shutdown_forecast_pool
+        report["warmup"] = warmup()
+        shutdown_forecast_pool()
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    else:
+        print(text)
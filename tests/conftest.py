@@ -0,0 +1,10 @@
+import os
+import tempfile
+
+# Modules read their cache locations at import: point them at a scratch
+# directory before any test imports them, so tests never touch real caches
+_workdir = tempfile.mkdtemp(prefix="sales-tests-")
+os.environ.setdefault("SALES_DATA_CACHE_DIR", os.path.join(_workdir, "sidecar"))
+os.environ.setdefault("PLOT_DIR", os.path.join(_workdir, "plots"))
+os.environ.setdefault("FORECAST_STORE_PATH", os.path.join(_workdir, "forecast_store.sqlite3"))
+os.environ.setdefault("LLM_CACHE_PATH", os.path.join(_workdir, "llm_cache.sqlite3"))
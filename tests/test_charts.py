@@ -0,0 +1,74 @@
+import xml.etree.ElementTree as ET
+import numpy as np
+import pandas as pd
+from fastapi.testclient import TestClient
+import charts
+import utils
+
+SVG = "{http://www.w3.org/2000/svg}"
+SOUTH = {"Region": ["South"]}
+
+
+def south():
+    return utils.filter_sales_data(utils.load_data(), SOUTH)
+
+
+def test_plot_payload_holds_history_and_forecast_band():
+    series = south()
+    payload = charts.chart_payload(series, 3, SOUTH, "plot", "holt_winters", "months")
+    assert payload["kind"] == "plot"
+    history, forecast = payload["history"], payload["forecast"]
+    assert history["ds"] == series["ds"].to_numpy(dtype="datetime64[ms]").astype(np.int64).tolist()
+    assert history["y"] == np.round(series["y"].to_numpy(dtype=np.float64), 2).tolist()
+    assert {len(values) for values in forecast.values()} == {len(history["ds"]) + 3}
+    assert forecast["ds"] == sorted(forecast["ds"])
+    assert pd.Timestamp(forecast["ds"][-1], unit="ms") == pd.Timestamp("2023-09-01")
+    assert all(lo <= mid <= hi for lo, mid, hi in zip(forecast["yhat_lower"], forecast["yhat"], forecast["yhat_upper"]))
+    assert all(round(v, 2) == v for v in forecast["yhat"])
+
+
+def test_components_payload_skips_empty_components():
+    payload = charts.chart_payload(south(), 3, SOUTH, "components", "holt_winters", "months")
+    assert payload["kind"] == "components"
+    assert set(payload["components"]) <= set(charts.COMPONENT_COLUMNS)
+    assert payload["components"]
+    assert all(len(values) == len(payload["ds"]) and any(values) for values in payload["components"].values())
+
+
+def test_plot_svg_draws_band_line_and_one_dot_per_observation():
+    payload = charts.chart_payload(south(), 3, SOUTH, "plot", "holt_winters", "months")
+    root = ET.fromstring(charts.render_svg(payload))
+    assert root.tag == f"{SVG}svg"
+    assert (root.get("width"), root.get("height")) == (str(charts.SVG_WIDTH), str(charts.SVG_PANEL_HEIGHT))
+    assert len(root.findall(f"{SVG}polygon")) == 1
+    line = root.findall(f"{SVG}polyline")
+    assert len(line) == 1 and len(line[0].get("points").split()) == len(payload["forecast"]["ds"])
+    assert len(root.findall(f"{SVG}circle")) == len(payload["history"]["ds"])
+    for point in line[0].get("points").split():
+        x, y = map(float, point.split(","))
+        assert charts.SVG_MARGIN <= x <= charts.SVG_WIDTH - charts.SVG_MARGIN
+        assert charts.SVG_MARGIN <= y <= charts.SVG_PANEL_HEIGHT - charts.SVG_MARGIN
+
+
+def test_components_svg_stacks_one_escaped_panel_per_component():
+    payload = {"kind": "components", "ds": [0, 86_400_000, 172_800_000],
+               "components": {"trend": [1.0, 2.0, 3.0], "<yearly>": [0.5, -0.5, 0.5]}}
+    svg = charts.render_svg(payload)
+    root = ET.fromstring(svg)
+    assert root.get("height") == str(2 * charts.SVG_PANEL_HEIGHT)
+    assert len(root.findall(f"{SVG}polyline")) == 2
+    assert "&lt;yearly&gt;" in svg
+    titles = [text.text for text in root.findall(f"{SVG}text") if text.get("font-weight") == "bold"]
+    assert titles == ["trend", "<yearly>"]
+
+
+def test_plot_route_renders_json_and_svg():
+    import main
+    client = TestClient(main.app)
+    body = {"filters": SOUTH, "periods": 3, "period_type": "months", "backend": "holt_winters"}
+    payload = client.post("/plot", json=body).json()
+    assert payload == charts.chart_payload(south(), 3, SOUTH, "plot", "holt_winters", "months")
+    response = client.post("/plot", json={**body, "render": "svg"})
+    assert response.headers["content-type"].startswith("image/svg+xml")
+    assert response.text == charts.render_svg(payload)
+    assert client.post("/plot", json={**body, "render": "gif"}).status_code == 400
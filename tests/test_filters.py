@@ -0,0 +1,66 @@
+import pandas as pd
+import pytest
+import utils
+
+DF = utils.read_sales_data(utils.DATA_PATH, use_sidecar=False)
+
+
+def first_values(col, n=1):
+    return [str(v) for v in sorted(DF[col].dropna().astype(str).unique())[:n]]
+
+
+FILTERS = [
+    {},
+    {"Region": first_values("Region")},
+    {"Region": first_values("Region", 2)},
+    {"Region": first_values("Region", 2), "Product": first_values("Product", 3)},
+    {"Regional Manager": first_values("Regional Manager"), "Customer": first_values("Customer", 2)},
+    {"Sales Channel": first_values("Sales Channel")},
+    {"Sales Channel": first_values("Sales Channel"), "Region": first_values("Region", 3)},
+    {"Product Detail": first_values("Product Detail", 2), "Sales Head": first_values("Sales Head")},
+    {"Region": ["Atlantis"]},
+    {"Region": []},
+]
+
+
+def pandas_sums(df, filters):
+    for col, values in filters.items():
+        if values:
+            df = df[df[col].astype(str).isin(values)]
+    return df["y"].astype("float64").groupby(df["ds"]).sum().reset_index()
+
+
+def assert_same_sums(result, expected):
+    pd.testing.assert_frame_equal(result.reset_index(drop=True), expected, check_dtype=False,
+                                  check_index_type=False, rtol=1e-9)
+
+
+@pytest.mark.parametrize("filters", [f for f in FILTERS if all(col in utils.CUBE_DIMENSIONS for col in f)])
+def test_cube_matches_pandas(filters):
+    cube = utils.SalesCube(DF)
+    assert cube.covers(filters)
+    assert_same_sums(cube.aggregate(filters), pandas_sums(DF, filters))
+
+
+@pytest.mark.parametrize("filters", FILTERS)
+def test_index_matches_pandas(filters):
+    assert_same_sums(utils.FilterIndex(DF).aggregate(filters), pandas_sums(DF, filters))
+
+
+@pytest.mark.parametrize("filters", FILTERS)
+def test_row_id_index_matches_pandas(filters, monkeypatch):
+    # Every column past the cardinality bound keeps row-id arrays instead of bitsets
+    monkeypatch.setattr(utils, "BITSET_MAX_CARDINALITY", 1)
+    assert_same_sums(utils.FilterIndex(DF).aggregate(filters), pandas_sums(DF, filters))
+
+
+@pytest.mark.parametrize("filters", FILTERS)
+def test_filter_sales_data_matches_pandas(filters, monkeypatch):
+    monkeypatch.setattr(utils, "_datasets", [utils.Dataset(DF)])
+    assert_same_sums(utils.filter_sales_data(DF, filters), pandas_sums(DF, filters))
+
+
+@pytest.mark.parametrize("filters", FILTERS[:5])
+def test_appended_cube_matches_pandas(filters):
+    cube = utils.SalesCube(DF.iloc[:600]).appended(DF.iloc[600:])
+    assert_same_sums(cube.aggregate(filters), pandas_sums(DF, filters))
@@ -0,0 +1,167 @@
+import asyncio
+import threading
+import time
+import numpy as np
+import pandas as pd
+import pytest
+import utils
+
+
+@pytest.fixture(autouse=True)
+def empty_fit_cache():
+    utils.clear_fit_cache()
+    yield
+    utils.clear_fit_cache()
+
+
+def daily_series(days=120, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({"ds": pd.date_range("2023-01-01", periods=days, freq="D"),
+                         "y": rng.uniform(50, 150, days)})
+
+
+def fake_pool(monkeypatch, delay=0.05, error=None):
+    """Stand in for the Prophet pool with a quick NumPy fit; returns the call log."""
+    calls = []
+
+    async def run_in_forecast_pool(fn, series, steps, freq, backend, model):
+        calls.append(steps)
+        await asyncio.sleep(delay)
+        if error is not None:
+            raise error
+        return utils._fit_and_predict(series, steps, freq, "holt_winters")
+
+    monkeypatch.setattr(utils, "run_in_forecast_pool", run_in_forecast_pool)
+    return calls
+
+
+def test_concurrent_async_misses_share_one_fit(monkeypatch):
+    calls = fake_pool(monkeypatch)
+    df = daily_series()
+
+    async def run():
+        return await asyncio.gather(*(utils.aforecast_sales(df, 14, backend="prophet") for _ in range(5)))
+
+    results = asyncio.run(run())
+    assert calls == [14]
+    assert all(len(r) == 14 for r in results)
+    assert not utils._fit_inflight
+
+
+def test_waiter_needing_a_longer_horizon_refits(monkeypatch):
+    calls = fake_pool(monkeypatch)
+    df = daily_series()
+
+    async def run():
+        return await asyncio.gather(utils.aforecast_sales(df, 7, backend="prophet"),
+                                    utils.aforecast_sales(df, 30, backend="prophet"))
+
+    short, long = asyncio.run(run())
+    assert calls == [7, 30]
+    assert len(short) == 7 and len(long) == 30
+
+
+def test_fit_error_reaches_every_waiter_once(monkeypatch):
+    calls = fake_pool(monkeypatch, error=RuntimeError("fit failed"))
+    df = daily_series()
+
+    async def run():
+        return await asyncio.gather(*(utils.aforecast_sales(df, 14, backend="prophet") for _ in range(3)),
+                                    return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert len(calls) == 1
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert not utils._fit_inflight
+
+
+def test_cancelled_fit_hands_over_to_a_waiter(monkeypatch):
+    calls = fake_pool(monkeypatch, delay=0.1)
+    df = daily_series()
+
+    async def run():
+        first = asyncio.ensure_future(utils.aforecast_sales(df, 14, backend="prophet"))
+        await asyncio.sleep(0.01)
+        second = asyncio.ensure_future(utils.aforecast_sales(df, 14, backend="prophet"))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await second
+
+    assert len(asyncio.run(run())) == 14
+    assert calls == [14, 14]
+
+
+def test_sync_and_async_callers_share_one_fit(monkeypatch):
+    fits = []
+    real = utils._fit_and_predict
+
+    def slow_fit(series, steps, freq, backend="prophet", model=None):
+        fits.append(steps)
+        time.sleep(0.1)
+        return real(series, steps, freq, "holt_winters")
+
+    monkeypatch.setattr(utils, "_fit_and_predict", slow_fit)
+    calls = fake_pool(monkeypatch)
+    df = daily_series()
+    thread = threading.Thread(target=utils.forecast_sales, args=(df, 14), kwargs={"backend": "prophet"})
+    thread.start()
+    time.sleep(0.02)
+    result = asyncio.run(utils.aforecast_sales(df, 14, backend="prophet"))
+    thread.join()
+    assert fits == [14] and calls == []
+    assert len(result) == 14
+
+
+def test_scenarios_share_cache_entries_with_forecast():
+    df = utils.load_data()
+    filters = {"Region": ["South"]}
+    single = utils.forecast_sales(utils.filter_sales_data(df, filters), 3, filters, "holt_winters", "months")
+    misses = utils.fit_cache_info()["misses"]
+
+    scenarios = [{"filters": filters, "periods": 3, "period_type": "months", "backend": "holt_winters"},
+                 {"filters": {"Region": ["North"]}, "periods": 2, "period_type": "months", "backend": "holt_winters"}]
+    first, second = asyncio.run(utils.aforecast_scenarios(df, scenarios))
+    assert utils.fit_cache_info()["misses"] == misses + 1
+    pd.testing.assert_frame_equal(first.reset_index(drop=True), single.reset_index(drop=True))
+
+    north = {"Region": ["North"]}
+    utils.forecast_sales(utils.filter_sales_data(df, north), 2, north, "holt_winters", "months")
+    assert utils.fit_cache_info()["misses"] == misses + 1
+
+
+def test_segments_and_scenarios_wait_for_a_fit_in_flight(monkeypatch):
+    calls = fake_pool(monkeypatch, delay=0.1)
+    df = utils.load_data()
+    south = {"Region": ["South"]}
+    scenario = {"filters": south, "periods": 3, "period_type": "months", "backend": "prophet"}
+
+    async def segments():
+        return [item async for item in utils.aforecast_segments(df, [("Region", "South")], 3, backend="prophet",
+                                                                 period_type="months")]
+
+    async def run():
+        single = asyncio.ensure_future(utils.aforecast_sales(utils.filter_sales_data(df, south), 3, south, "prophet",
+                                                             "months"))
+        await asyncio.sleep(0.01)
+        return await asyncio.gather(single, segments(), utils.aforecast_scenarios(df, [scenario]))
+
+    single, [(_, _, segment)], [scenario_df] = asyncio.run(run())
+    assert calls == [3]
+    pd.testing.assert_frame_equal(segment, single)
+    pd.testing.assert_frame_equal(scenario_df, single, check_like=True)
+    assert not utils._fit_inflight
+
+
+def test_segments_stopped_early_release_their_claims(monkeypatch):
+    fake_pool(monkeypatch)
+    df = utils.load_data()
+    regions = [("Region", region) for region in df["Region"].dropna().unique()]
+
+    async def first_only():
+        forecasts = utils.aforecast_segments(df, regions, 3, backend="prophet", period_type="months")
+        async for item in forecasts:
+            await forecasts.aclose()
+            return item
+
+    assert asyncio.run(first_only()) is not None
+    assert not utils._fit_inflight
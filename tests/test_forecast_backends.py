@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+import pytest
+from forecast_backends import batch_forecast, grid_batches, observed_series
+
+
+def monthly(start, months, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({"ds": pd.date_range(start, periods=months, freq="MS"),
+                         "y": rng.uniform(100, 200, months)})
+
+
+@pytest.mark.parametrize("backend", ["holt_winters", "seasonal_naive"])
+def test_forecast_does_not_depend_on_batch_mates(backend):
+    target = monthly("2021-01-01", 30)
+    alone = batch_forecast([target], 6, backend, "MS")[0][1]
+    others = [monthly("2019-01-01", 60, seed=1), monthly("2021-01-01", 12, seed=2), monthly("2021-01-01", 30, seed=3)]
+    batched = batch_forecast([others[0], target, *others[1:]], 6, backend, "MS")[1][1]
+    pd.testing.assert_frame_equal(alone, batched)
+
+
+def test_series_ending_early_forecasts_its_own_future():
+    short, long = monthly("2021-01-01", 12), monthly("2021-01-01", 36, seed=1)
+    forecast = batch_forecast([short, long], 3, "holt_winters", "MS")[0][1]
+    future = forecast[forecast["ds"] > short["ds"].max()]
+    assert list(future["ds"]) == list(pd.date_range("2022-01-01", periods=3, freq="MS"))
+    assert len(forecast) == 12 + 3
+
+
+def half_years(years=3, seed=0):
+    """Jan-Jun of each year only, like the shipped sales data."""
+    rng = np.random.default_rng(seed)
+    ds = [pd.Timestamp(year, month, 1) for year in range(2021, 2021 + years) for month in range(1, 7)]
+    return pd.DataFrame({"ds": ds, "y": rng.uniform(26_000, 68_000, len(ds))})
+
+
+def test_gaps_are_not_filled_with_zero_sales():
+    series = half_years()
+    assert len(observed_series(series)) == len(series)
+    forecast = batch_forecast([series], 2, "seasonal_naive", "MS")[0][1]
+    assert forecast["ds"].tolist() == series["ds"].tolist() + [pd.Timestamp("2023-07-01"), pd.Timestamp("2023-08-01")]
+
+
+@pytest.mark.parametrize("backend", ["holt_winters", "seasonal_naive"])
+def test_seasonal_gap_series_forecasts_stay_in_range(backend):
+    series = half_years()
+    future = batch_forecast([series], 6, backend, "MS")[0][1].tail(6)
+    assert (future["yhat"] > 0.25 * series["y"].min()).all()
+    assert (future["yhat"] < 2 * series["y"].max()).all()
+
+
+def test_only_identical_grids_are_stacked():
+    series = [monthly("2021-01-01", 12), monthly("2021-01-01", 12, seed=1), monthly("2021-02-01", 12)]
+    batches = [(freq, positions, Y.shape) for freq, _, _, positions, Y in grid_batches(series, "MS")]
+    assert batches == [("MS", [0, 1], (2, 12)), ("MS", [2], (1, 12))]
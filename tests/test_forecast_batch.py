@@ -0,0 +1,15 @@
+import sys
+from fastapi.testclient import TestClient
+import main
+
+
+def test_orjson_fallback_warns_once(monkeypatch, capsys):
+    monkeypatch.setitem(sys.modules, "orjson", None)
+    monkeypatch.setattr(main, "_orjson_warned", False)
+    client = TestClient(main.app)
+    body = {"scenarios": [{"periods": 2, "period_type": "months", "backend": "holt_winters"}], "format": "orjson"}
+    for _ in range(3):
+        response = client.post("/forecast/batch", json=body)
+        assert response.status_code == 200
+        assert len(response.json()["results"][0]["yhat"]) == 2
+    assert capsys.readouterr().out.count("orjson is not installed") == 1
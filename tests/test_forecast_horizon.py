@@ -0,0 +1,47 @@
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+import utils
+
+DAILY = pd.DataFrame({"ds": pd.date_range("2024-01-01", "2024-03-31", freq="D"), "y": 1.0})
+MONTHLY = pd.DataFrame({"ds": pd.date_range("2023-01-01", periods=15, freq="MS"), "y": 1.0})
+
+
+@pytest.mark.parametrize("period_type, periods, freq, steps", [
+    ("days", 30, "D", 30),
+    ("weeks", 4, "W", 4),
+    ("months", 3, "MS", 3),
+    ("years", 1, "MS", 12),
+    ("years", 2, "MS", 24),
+])
+def test_daily_series_steps(period_type, periods, freq, steps):
+    series, got_freq, got_steps = utils.forecast_horizon(DAILY, periods, period_type)
+    assert (got_freq, got_steps) == (freq, steps)
+    assert pd.infer_freq(series["ds"]).startswith(freq)
+
+
+@pytest.mark.parametrize("period_type, periods, steps", [
+    ("days", 30, 1),
+    ("days", 45, 2),
+    ("weeks", 4, 1),
+    ("months", 3, 3),
+    ("years", 1, 12),
+])
+def test_monthly_series_never_runs_finer_than_the_data(period_type, periods, steps):
+    series, freq, got_steps = utils.forecast_horizon(MONTHLY, periods, period_type)
+    assert (freq, got_steps) == ("MS", steps)
+    assert len(series) == len(MONTHLY)
+
+
+@pytest.mark.parametrize("periods", [0, -3])
+def test_non_positive_periods_are_rejected(periods):
+    with pytest.raises(ValueError, match="periods"):
+        utils.forecast_horizon(DAILY, periods, "days")
+
+
+@pytest.mark.parametrize("path", ["/forecast", "/plot"])
+def test_routes_reject_non_positive_periods(path):
+    import main
+    response = TestClient(main.app).post(path, json={"periods": 0, "backend": "holt_winters"})
+    assert response.status_code == 400
+    assert "periods" in response.json()["detail"]
@@ -0,0 +1,54 @@
+import asyncio
+import pandas as pd
+import forecast_store
+import utils
+
+
+def sales(regions=("North", "South")):
+    dates = pd.date_range("2024-01-01", periods=60, freq="D")
+    return pd.concat([
+        pd.DataFrame({"ds": dates, "Region": region, "y": range(60)}) for region in regions
+    ], ignore_index=True)
+
+
+def fitted(steps):
+    return pd.DataFrame({"ds": pd.date_range("2024-03-01", periods=steps, freq="D"),
+                         "yhat": 1.0, "yhat_lower": 0.0, "yhat_upper": 2.0})
+
+
+def test_stored_segments_are_served_and_misses_written_back(tmp_path, monkeypatch):
+    store = forecast_store.ForecastStore(str(tmp_path / "store.sqlite3"))
+    monkeypatch.setattr(forecast_store, "_forecast_store", store)
+    df = sales()
+    series, freq, steps = utils.segment_series(df, "Region", "North", 5, "days")
+    store.put("Region", "North", freq, steps, utils.series_digest(series), fitted(steps))
+    fitted_segments = []
+
+    async def fake_fit(df, segments, periods, *args):
+        for col, val in segments:
+            fitted_segments.append((col, val))
+            yield col, val, fitted(periods)
+
+    monkeypatch.setattr(utils, "aforecast_segments", fake_fit)
+
+    async def collect():
+        return [(col, val) async for col, val, _ in forecast_store.aforecast_segments(
+            df, [("Region", "North"), ("Region", "South")], 5, backend="prophet")]
+
+    assert asyncio.run(collect()) == [("Region", "North"), ("Region", "South")]
+    assert fitted_segments == [("Region", "South")]
+    assert store.digest("Region", "South", freq, steps) is not None
+
+
+def test_store_status_digests_once_per_dataset_version(monkeypatch):
+    monkeypatch.setattr(utils, "_datasets", [utils.Dataset(sales())])
+    monkeypatch.setattr(forecast_store, "_status_digests", None)
+    calls = []
+    segment_series = forecast_store.segment_series
+    monkeypatch.setattr(forecast_store, "segment_series", lambda *a: calls.append(a) or segment_series(*a))
+    forecast_store.store_status(["Region"])
+    forecast_store.store_status(["Region"])
+    assert len(calls) == 2
+    utils._datasets.append(utils.Dataset(sales(("North",)), version=2))
+    forecast_store.store_status(["Region"])
+    assert len(calls) == 3
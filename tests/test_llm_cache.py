@@ -0,0 +1,49 @@
+import time
+from llm_cache import LLMResponseCache
+
+
+def make_cache(tmp_path, **kwargs):
+    return LLMResponseCache(str(tmp_path / "llm_cache.sqlite3"), **kwargs)
+
+
+def test_put_get_and_stats(tmp_path):
+    cache = make_cache(tmp_path)
+    key = cache.key("model", "prompt")
+    assert cache.get(key) is None
+    cache.put(key, '{"a": 1}', 10)
+    assert cache.get(key) == '{"a": 1}'
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 1 and stats["tokens_saved"] == 10
+    assert cache.key("model", "prompt") != cache.key("other", "prompt")
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    cache = make_cache(tmp_path)
+    key = cache.key("model", "prompt")
+    cache.put(key, "text", 3)
+    assert make_cache(tmp_path).get(key) == "text"
+
+
+def test_expired_entries_are_misses(tmp_path):
+    cache = make_cache(tmp_path, ttl=0.05)
+    key = cache.key("model", "prompt")
+    cache.put(key, "text", 3)
+    time.sleep(0.1)
+    assert cache.get(key) is None
+
+
+def test_trim_keeps_entries_hot_in_memory(tmp_path):
+    cache = make_cache(tmp_path, max_entries=2)
+    hot, cold = cache.key("m", "hot"), cache.key("m", "cold")
+    cache.put(hot, "hot", 1)
+    time.sleep(0.01)
+    cache.put(cold, "cold", 1)
+    time.sleep(0.01)
+    # Served from memory only; its disk access time must still move forward
+    assert cache.get(hot) == "hot"
+    time.sleep(0.01)
+    cache.put(cache.key("m", "new"), "new", 1)
+
+    fresh = make_cache(tmp_path, max_entries=2)
+    assert fresh.get(hot) == "hot"
+    assert fresh.get(cold) is None
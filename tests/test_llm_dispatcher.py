@@ -0,0 +1,122 @@
+import time
+import asyncio
+from types import SimpleNamespace
+import pytest
+from benchmarks.stub_llm import LocalStubChatClient
+from genai_insights import LLMDispatcher, TokenBucket, _is_transient
+from llm_pool import ChatClientPool
+
+
+class FlakyClient:
+    """Raises the given errors in order, then answers."""
+
+    model = "flaky"
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    async def create(self, messages, **kwargs):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return SimpleNamespace(content='{"insight": "ok"}')
+
+
+class StatusError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+def dispatcher(client, **kwargs):
+    kwargs.setdefault("rate_limiter", TokenBucket(0))
+    kwargs.setdefault("backoff", 0)
+    return LLMDispatcher(client, use_cache=False, **kwargs)
+
+
+def test_retries_transient_errors():
+    client = FlakyClient(ConnectionError("reset"), StatusError(503), StatusError(429))
+    text = asyncio.run(dispatcher(client, max_retries=3).complete("prompt"))
+    assert text == '{"insight": "ok"}'
+    assert client.calls == 4
+
+
+def test_gives_up_after_max_retries():
+    client = FlakyClient(*[ConnectionError("reset")] * 5)
+    with pytest.raises(ConnectionError):
+        asyncio.run(dispatcher(client, max_retries=2).complete("prompt"))
+    assert client.calls == 3
+
+
+def test_does_not_retry_client_errors():
+    client = FlakyClient(StatusError(400))
+    with pytest.raises(StatusError):
+        asyncio.run(dispatcher(client, max_retries=3).complete("prompt"))
+    assert client.calls == 1
+
+    client = FlakyClient(ValueError("bad prompt"))
+    with pytest.raises(ValueError):
+        asyncio.run(dispatcher(client, max_retries=3).complete("prompt"))
+    assert client.calls == 1
+
+
+def test_is_transient():
+    assert _is_transient(asyncio.TimeoutError())
+    assert _is_transient(ConnectionError())
+    assert _is_transient(StatusError(500))
+    assert _is_transient(StatusError(408))
+    assert not _is_transient(StatusError(401))
+    assert not _is_transient(KeyError("x"))
+    assert _is_transient(type("APIConnectionError", (Exception,), {})())
+
+
+def test_timeout_is_retried():
+    client = LocalStubChatClient(latency=0.2)
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(dispatcher(client, timeout=0.05, max_retries=1).complete("prompt"))
+    assert client.calls == 2
+
+
+def test_pool_wait_does_not_count_against_timeout():
+    async def run():
+        # One connection, four calls of 0.1s each: the last waits 0.3s for a
+        # slot but its own call still fits in the 0.15s timeout
+        pool = ChatClientPool(LocalStubChatClient(latency=0.1), max_connections=1)
+        d = dispatcher(pool, timeout=0.15, max_retries=0)
+        return await d.complete_all(["a", "b", "c", "d"]), pool
+
+    results, pool = asyncio.run(run())
+    assert all(isinstance(r, str) for r in results), results
+    assert pool.completed == 4 and pool.failed == 0
+
+
+def test_concurrency_and_rate_limit():
+    async def run(d, client):
+        start = time.monotonic()
+        results = await d.complete_all([str(i) for i in range(6)])
+        return results, time.monotonic() - start
+
+    client = LocalStubChatClient(latency=0.1)
+    results, elapsed = asyncio.run(run(dispatcher(client, max_concurrency=2), client))
+    assert len(results) == 6 and client.calls == 6
+    # Three waves of two
+    assert 0.28 <= elapsed < 0.6
+
+    # 10/sec with a burst of 1: six calls need at least 0.5s of tokens
+    client = LocalStubChatClient()
+    results, elapsed = asyncio.run(run(dispatcher(client, rate_limiter=TokenBucket(10, 1)), client))
+    assert client.calls == 6
+    assert elapsed >= 0.45
+
+
+def test_results_keep_input_order():
+    client = LocalStubChatClient(responder=lambda prompt: f'"{prompt}"')
+    results = asyncio.run(dispatcher(client).complete_all(["x", "y", "z"]))
+    assert results == ['"x"', '"y"', '"z"']
+
+
+def test_chat_client_needs_an_api_key(monkeypatch):
+    monkeypatch.delenv("GEMINI_API_KEY", raising=False)
+    with pytest.raises(RuntimeError, match="GEMINI_API_KEY"):
+        ChatClientPool().client
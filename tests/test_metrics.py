@@ -0,0 +1,72 @@
+import os
+import time
+from fastapi.testclient import TestClient
+import metrics
+
+
+def test_counter_and_histogram_render_prometheus_text():
+    registry = metrics.Registry()
+    calls = metrics.Counter("calls_total", "Calls by outcome.", ["outcome"], registry=registry)
+    latency = metrics.Histogram("latency_seconds", "Latency.", ["route"], buckets=(0.1, 1), registry=registry)
+    calls.inc(outcome="ok")
+    calls.inc(2, outcome='say "hi"\n')
+    for seconds in (0.05, 0.5, 5):
+        latency.observe(seconds, route="/forecast")
+    lines = registry.render().splitlines()
+    assert "# TYPE calls_total counter" in lines
+    assert 'calls_total{outcome="ok"} 1' in lines
+    assert 'calls_total{outcome="say \\"hi\\"\\n"} 2' in lines
+    assert 'latency_seconds_bucket{route="/forecast",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{route="/forecast",le="1"} 2' in lines
+    assert 'latency_seconds_bucket{route="/forecast",le="+Inf"} 3' in lines
+    assert 'latency_seconds_sum{route="/forecast"} 5.55' in lines
+    assert 'latency_seconds_count{route="/forecast"} 3' in lines
+
+
+def test_failing_collector_is_skipped(capsys):
+    registry = metrics.Registry()
+
+    def broken():
+        raise RuntimeError("boom")
+
+    registry.add_collector(broken)
+    registry.add_collector(lambda: [("rows", "gauge", "Rows loaded.", [({"source": "csv"}, 1000)])])
+    assert registry.render().splitlines()[-1] == 'rows{source="csv"} 1000'
+    assert "Metrics collector broken failed: boom" in capsys.readouterr().out
+
+
+def test_spans_add_up_per_request_stage():
+    stages = metrics.defaultdict(float)
+    token = metrics._request_stages.set(stages)
+    try:
+        with metrics.span("fit"):
+            time.sleep(0.01)
+        metrics.record("fit", 0.5)
+    finally:
+        metrics._request_stages.reset(token)
+    assert 0.51 <= stages["fit"] < 0.6
+    metrics.record("fit", 1)  # outside a request: histogram only
+    assert set(stages) == {"fit"}
+
+
+def test_requests_get_server_timing_and_route_metrics():
+    import main
+    client = TestClient(main.app)
+    body = {"filters": {"Region": ["South"]}, "periods": 2, "period_type": "months", "backend": "holt_winters"}
+    response = client.post("/forecast", json=body)
+    timing = dict(part.split(";dur=") for part in response.headers["Server-Timing"].split(", "))
+    assert "filter_sales_data" in timing and float(timing["filter_sales_data"]) >= 0
+    scrape = client.get("/metrics").text
+    assert 'http_request_duration_seconds_count{method="POST",route="/forecast",status="200"}' in scrape
+    assert 'sales_stage_duration_seconds_count{stage="filter_sales_data"}' in scrape
+
+
+def test_forced_profile_is_written_and_served(tmp_path, monkeypatch):
+    import main
+    monkeypatch.setattr(metrics, "PROFILE_DIR", str(tmp_path))
+    client = TestClient(main.app)
+    response = client.get("/filters", headers={"X-Profile": "1"})
+    name = response.headers["X-Profile"].rsplit("/", 1)[-1]
+    assert os.path.isfile(tmp_path / name) and name.endswith(".folded")
+    assert metrics.profile_path(name) == str(tmp_path / name)
+    assert metrics.profile_path("../" + name) is None
@@ -0,0 +1,67 @@
+import base64
+import json
+import os
+import time
+from plot_store import PlotStore
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\0" * 100
+
+
+def test_saved_plot_is_visible_to_another_store(tmp_path):
+    first, second = PlotStore(str(tmp_path)), PlotStore(str(tmp_path))
+    entry = first.save("plot_a.png", PNG, "plot", 30)
+    assert second.get("plot_a.png")["etag"] == entry["etag"]
+    assert second.read("plot_a.png") == PNG
+    assert second.list()["total"] == 1
+
+
+def test_concurrent_stores_do_not_drop_each_others_entries(tmp_path):
+    stores = [PlotStore(str(tmp_path)) for _ in range(3)]
+    for i, store in enumerate(stores * 3):
+        store.save(f"plot_{i}.png", PNG, "plot")
+    assert stores[0].list()["total"] == 9
+
+
+def test_lookup_touches_at_most_once_per_interval(tmp_path):
+    store = PlotStore(str(tmp_path), touch_interval=3600)
+    store.save("plot_a.png", PNG, "plot")
+    used_at = store.get("plot_a.png")["used_at"]
+    store.lookup("plot_a.png")
+    assert store.get("plot_a.png")["used_at"] == used_at
+
+    store.touch_interval = 0
+    time.sleep(0.01)
+    store.lookup("plot_a.png")
+    assert store.get("plot_a.png")["used_at"] > used_at
+
+
+def test_evicts_least_recently_used_beyond_max_bytes(tmp_path):
+    store = PlotStore(str(tmp_path), max_bytes=len(PNG) * 2, touch_interval=0)
+    store.save("plot_a.png", PNG, "plot")
+    time.sleep(0.01)
+    store.save("plot_b.png", PNG, "plot")
+    time.sleep(0.01)
+    store.lookup("plot_a.png")
+    time.sleep(0.01)
+    store.save("plot_c.png", PNG, "plot")
+    assert store.get("plot_b.png") is None
+    assert not os.path.exists(store.path("plot_b.png"))
+    assert store.get("plot_a.png") and store.get("plot_c.png")
+
+
+def test_legacy_files_are_converted_once(tmp_path):
+    now = time.time()
+    (tmp_path / "plot_123_30.b64").write_text(base64.b64encode(PNG).decode())
+    (tmp_path / "manifest.json").write_text(json.dumps({"plot_old.png": {
+        "filename": "plot_old.png", "kind": "plot", "periods": 7, "size": len(PNG), "etag": "x",
+        "created_at": now - 10, "used_at": now - 5}}))
+    (tmp_path / "plot_old.png").write_bytes(PNG)
+    store = PlotStore(str(tmp_path))
+    assert store.get("plot_123_30.png")["periods"] == 30
+    assert store.get("plot_old.png")["used_at"] == now - 5
+    assert not (tmp_path / "manifest.json").exists()
+    assert (tmp_path / "plot_123_30.b64").exists()
+
+    os.remove(store.path("plot_123_30.png"))
+    PlotStore(str(tmp_path))
+    assert not os.path.exists(store.path("plot_123_30.png"))
@@ -0,0 +1,63 @@
+import os
+import utils
+
+DATA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "synthetic_sales_data.csv")
+
+
+def csv_lines(n):
+    with open(DATA, "rb") as f:
+        lines = f.read().splitlines(keepends=True)
+    return lines[0], lines[1:n + 1]
+
+
+def test_full_parse_leaves_a_partial_row_for_the_next_append(tmp_path, monkeypatch):
+    header, rows = csv_lines(12)
+    path = tmp_path / "sales.csv"
+    partial = rows[10][:15]
+    path.write_bytes(header + b"".join(rows[:10]) + partial)
+
+    df = utils.read_sales_data(str(path), use_sidecar=False)
+    assert df.attrs["source_offset"] == len(header) + sum(map(len, rows[:10]))
+
+    monkeypatch.setattr(utils, "_datasets", [utils.Dataset(df)])
+    with open(path, "ab") as f:
+        f.write(rows[10][15:] + rows[11])
+    result = utils._reload_local(str(path))
+    assert result["rows_added"] == 2 and not result["full_reload"]
+    assert len(utils.get_dataset().df) == 12
+    assert result["source_offset"] == os.path.getsize(path)
+
+
+def test_full_parse_keeps_a_complete_last_row_without_newline(tmp_path):
+    header, rows = csv_lines(10)
+    path = tmp_path / "sales.csv"
+    path.write_bytes(header + b"".join(rows[:9]) + rows[9].rstrip(b"\r\n"))
+
+    df = utils.read_sales_data(str(path), use_sidecar=False)
+    assert df.attrs["source_offset"] == path.stat().st_size
+    assert len(df) == 10
+
+
+def test_sidecar_keeps_the_parsed_offset(tmp_path, monkeypatch):
+    monkeypatch.setattr(utils, "DATA_CACHE_DIR", str(tmp_path / "sidecar"))
+    header, rows = csv_lines(5)
+    path = tmp_path / "sales.csv"
+    path.write_bytes(header + b"".join(rows[:4]) + rows[4][:10])
+    first = utils.read_sales_data(str(path))
+    second = utils.read_sales_data(str(path))
+    assert len(second) == len(first) == 4
+    assert second.attrs["source_offset"] == first.attrs["source_offset"] < os.path.getsize(path)
+
+
+def test_appended_rows_are_folded_into_a_new_version(tmp_path, monkeypatch):
+    header, rows = csv_lines(8)
+    path = tmp_path / "sales.csv"
+    path.write_bytes(header + b"".join(rows[:6]))
+    monkeypatch.setattr(utils, "_datasets", [utils.Dataset(utils.read_sales_data(str(path), use_sidecar=False))])
+    assert utils._reload_local(str(path))["rows_added"] == 0
+    with open(path, "ab") as f:
+        f.write(b"".join(rows[6:]))
+    result = utils._reload_local(str(path))
+    assert result["rows_added"] == 2 and result["version"] == 2
+    total = utils.get_dataset().cube.aggregate({})["y"].sum()
+    assert abs(total - utils.get_dataset().df["y"].astype(float).sum()) < 1e-3
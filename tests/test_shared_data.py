@@ -0,0 +1,49 @@
+import os
+import pytest
+import shared_data
+
+DATA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "synthetic_sales_data.csv")
+
+
+@pytest.fixture
+def shared_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(shared_data, "SHARED_DATA_DIR", str(tmp_path / "shared"))
+    return tmp_path
+
+
+def write_csv(path, rows, mtime=None):
+    with open(DATA, "rb") as f:
+        lines = f.read().splitlines(keepends=True)
+    path.write_bytes(lines[0] + b"".join(lines[1:rows + 1]))
+    if mtime is not None:
+        os.utime(path, ns=(mtime, mtime))
+
+
+def test_attaches_to_the_published_version(shared_dir):
+    path = shared_dir / "sales.csv"
+    write_csv(path, 50)
+    first = shared_data.load_shared(str(path))
+    second = shared_data.load_shared(str(path))
+    assert first.version == second.version == 1
+    assert first.shared_path == second.shared_path
+    assert len(second.df) == 50
+    assert second.cube.aggregate({})["y"].sum() == pytest.approx(float(first.df["y"].astype(float).sum()), rel=1e-6)
+
+
+def test_regenerated_source_is_not_served_from_the_old_version(shared_dir):
+    path = shared_dir / "sales.csv"
+    write_csv(path, 50, mtime=1_000_000_000_000_000_000)
+    assert len(shared_data.load_shared(str(path)).df) == 50
+    # Same path, different contents: a new version is published
+    write_csv(path, 30, mtime=1_000_000_001_000_000_000)
+    dataset = shared_data.load_shared(str(path))
+    assert dataset.version == 2 and len(dataset.df) == 30
+
+
+def test_other_source_is_not_attached(shared_dir):
+    first, second = shared_dir / "a.csv", shared_dir / "b.csv"
+    write_csv(first, 20)
+    write_csv(second, 10)
+    shared_data.load_shared(str(first))
+    assert shared_data.published_meta(str(second)) is None
+    assert len(shared_data.load_shared(str(second)).df) == 10
@@ -0,0 +1,64 @@
+import os
+import pandas as pd
+import pytest
+import utils
+
+DATA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "synthetic_sales_data.csv")
+
+
+@pytest.fixture
+def csv_copy(tmp_path, monkeypatch):
+    monkeypatch.setattr(utils, "DATA_CACHE_DIR", str(tmp_path / "sidecar"))
+    with open(DATA, "rb") as f:
+        lines = f.read().splitlines(keepends=True)
+    path = tmp_path / "sales.csv"
+    path.write_bytes(b"".join(lines[:101]))
+    return path, lines
+
+
+def no_csv_parse(monkeypatch):
+    def fail(frame):
+        raise AssertionError("the CSV was parsed")
+    monkeypatch.setattr(utils, "parse_sales_frame", fail)
+
+
+def test_second_read_comes_from_the_sidecar(csv_copy, monkeypatch):
+    path, _ = csv_copy
+    parsed = utils.read_sales_data(str(path))
+    assert all(os.path.exists(p) for p in utils._sidecar_paths(str(path)))
+
+    no_csv_parse(monkeypatch)
+    cached = utils.read_sales_data(str(path))
+    pd.testing.assert_frame_equal(cached, parsed)
+    assert cached.attrs["source_offset"] == path.stat().st_size
+
+
+def test_changed_csv_is_parsed_again(csv_copy):
+    path, lines = csv_copy
+    assert len(utils.read_sales_data(str(path))) == 100
+    path.write_bytes(b"".join(lines[:121]))
+    assert len(utils.read_sales_data(str(path))) == 120
+
+
+def test_unreadable_sidecar_falls_back_to_the_csv(csv_copy):
+    path, _ = csv_copy
+    utils.read_sales_data(str(path))
+    data_path, meta_path = utils._sidecar_paths(str(path))
+    with open(meta_path, "w") as f:
+        f.write("{not json")
+    assert len(utils.read_sales_data(str(path))) == 100
+
+    os.remove(data_path)
+    assert len(utils.read_sales_data(str(path))) == 100
+
+
+def test_failed_sidecar_write_still_returns_the_frame(csv_copy, monkeypatch, capsys):
+    path, _ = csv_copy
+
+    def no_parquet(self, *args, **kwargs):
+        raise ImportError("no parquet engine")
+
+    monkeypatch.setattr(pd.DataFrame, "to_parquet", no_parquet)
+    assert len(utils.read_sales_data(str(path))) == 100
+    assert "Could not write data sidecar" in capsys.readouterr().out
+    assert not os.path.exists(utils._sidecar_paths(str(path))[1])
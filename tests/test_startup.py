@@ -0,0 +1,74 @@
+import asyncio
+import fcntl
+import threading
+import time
+import pytest
+import forecast_store
+import utils
+
+
+async def loop_stall(task_factory, hold: float = 0.5) -> float:
+    """Longest event loop stall while task runs and another thread holds _dataset_lock."""
+    released = threading.Event()
+
+    def hold_lock():
+        with utils._dataset_lock:
+            released.wait(hold)
+
+    holder = threading.Thread(target=hold_lock)
+    holder.start()
+    task = asyncio.ensure_future(task_factory())
+    worst, last = 0.0, time.perf_counter()
+    for _ in range(10):
+        await asyncio.sleep(0.02)
+        now = time.perf_counter()
+        worst, last = max(worst, now - last - 0.02), now
+    released.set()
+    task.cancel()
+    holder.join()
+    return worst
+
+
+def test_data_watcher_does_not_block_on_the_dataset_lock(monkeypatch):
+    monkeypatch.setattr(utils, "_datasets", [])
+    stall = asyncio.run(loop_stall(lambda: utils.run_data_watcher(interval=0.01)))
+    assert stall < 0.1
+
+
+def test_store_refresher_does_not_block_on_the_dataset_lock(monkeypatch, tmp_path):
+    monkeypatch.setattr(utils, "_datasets", [])
+    monkeypatch.setattr(forecast_store, "FORECAST_STORE_LOCK_PATH", str(tmp_path / "store.lock"))
+    monkeypatch.setattr(forecast_store, "_refresher_lock_file", None)
+    stall = asyncio.run(loop_stall(lambda: forecast_store.run_forecast_store_refresher(["Region"], interval=60)))
+    assert stall < 0.1
+
+
+def test_only_one_process_owns_the_store_refresher(monkeypatch, tmp_path):
+    lock_path = tmp_path / "store.lock"
+    monkeypatch.setattr(forecast_store, "FORECAST_STORE_LOCK_PATH", str(lock_path))
+    monkeypatch.setattr(forecast_store, "_refresher_lock_file", None)
+    # flock conflicts between open files even within one process, as between workers
+    with open(lock_path, "a") as other:
+        fcntl.flock(other, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        assert not forecast_store.refresher_owner()
+        fcntl.flock(other, fcntl.LOCK_UN)
+    assert forecast_store.refresher_owner()
+    assert forecast_store.refresher_owner()
+    with open(lock_path, "a") as other:
+        with pytest.raises(BlockingIOError):
+            fcntl.flock(other, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    forecast_store._refresher_lock_file.close()
+
+
+def test_async_routes_do_not_block_on_the_dataset_lock(monkeypatch):
+    import httpx
+    import main
+    monkeypatch.setattr(utils, "_datasets", [])
+
+    async def request():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            await client.post("/forecast/batch", json={"scenarios": [{"periods": 2, "backend": "holt_winters"}]})
+
+    stall = asyncio.run(loop_stall(request))
+    assert stall < 0.1
@@ -0,0 +1,62 @@
+import json
+import pytest
+from fastapi.testclient import TestClient
+import genai_insights
+import main
+
+ITEMS = [{"Region: North": {"Insight": "up", "Forecast": "steady"}}, {"Region: South": {"Insight": "down\nlate"}}]
+
+
+def fake_summary(items, error=None):
+    async def iter_summary(df, group_cols, periods, period_type, use_cache=True):
+        for item in items:
+            yield item
+        if error is not None:
+            raise error
+    return iter_summary
+
+
+def stream(monkeypatch, fmt, error=None):
+    monkeypatch.setattr(genai_insights, "iter_genai_forecast_summary", fake_summary(ITEMS, error))
+    return TestClient(main.app).get("/genai-forecast-summary/stream", params={"format": fmt})
+
+
+def sse_events(body: str):
+    assert body.endswith("\n\n")
+    events = []
+    for frame in body[:-2].split("\n\n"):
+        event, data = frame.split("\n")
+        assert event.startswith("event: ") and data.startswith("data: ")
+        events.append((event[len("event: "):], json.loads(data[len("data: "):])))
+    return events
+
+
+def test_ndjson_is_one_json_object_per_line(monkeypatch):
+    response = stream(monkeypatch, "ndjson")
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert response.text.endswith("\n")
+    assert [json.loads(line) for line in response.text.splitlines()] == ITEMS
+
+
+def test_sse_frames_each_segment_then_done(monkeypatch):
+    response = stream(monkeypatch, "sse")
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert response.headers["cache-control"] == "no-cache"
+    assert sse_events(response.text) == [("segment", ITEMS[0]), ("segment", ITEMS[1]), ("done", {})]
+
+
+@pytest.mark.parametrize("fmt", ["ndjson", "sse"])
+def test_failure_mid_stream_is_reported_in_band(monkeypatch, fmt):
+    response = stream(monkeypatch, fmt, RuntimeError("LLM unavailable"))
+    assert response.status_code == 200
+    if fmt == "sse":
+        events = sse_events(response.text)
+        assert events[-1] == ("done", {})
+        items = [data for _, data in events[:-1]]
+    else:
+        items = [json.loads(line) for line in response.text.splitlines()]
+    assert items == ITEMS + [{"error": "RuntimeError: LLM unavailable"}]
+
+
+def test_unknown_stream_format_is_rejected(monkeypatch):
+    assert stream(monkeypatch, "xml").status_code == 400
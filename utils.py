@@ -1,6 +1,22 @@
+import numpy as np
 import pandas as pd
-from functools import lru_cache
-from datetime import datetime
+import asyncio
+import calendar
+import copy
+import csv
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor, CancelledError as FutureCancelledError
+from concurrent.futures.process import BrokenProcessPool
+from forecast_backends import validate_backend
+from metrics import REGISTRY, record, span
 
 FILTER_COLUMNS = [
     "Product",
@@ -12,88 +28,1258 @@ FILTER_COLUMNS = [
     "Sales Head"
 ]
 
-@lru_cache(maxsize=1)
-def load_data():
-    df = pd.read_csv("synthetic_sales_data.csv")
-    # Standardize column names
-    df = df.rename(columns={
-        "Customer Category": "Customer category",
-        "SalesOffice": "Sales office",
-        "Price": "y",
-        "Year": "year",
-        "Month": "month"
-    })
-    # Combine year and month into a date (ds)
-    df["ds"] = df.apply(lambda row: pd.to_datetime(f"{row['year']} {row['month']} 1"), axis=1)
+# Group-by columns used by the GenAI endpoints that are not user-facing filters
+CATEGORY_COLUMNS = FILTER_COLUMNS + ["Regional Manager"]
+
+DATA_PATH = os.getenv("SALES_DATA_PATH", "synthetic_sales_data.csv")
+DATA_CACHE_DIR = os.getenv("SALES_DATA_CACHE_DIR", ".data_cache")
+# Directory (ideally on tmpfs) where workers share memory-mapped dataset
+# versions instead of each loading its own copy; empty keeps data per process.
+# See shared_data.
+SHARED_DATA_DIR = os.getenv("SHARED_DATA_DIR", "")
+
+COLUMN_RENAMES = {
+    "Customer Category": "Customer category",
+    "SalesOffice": "Sales office",
+    "Price": "y",
+    "Year": "year",
+    "Month": "month"
+}
+
+# "January" / "Jan" / "jan" -> 1, keyed on the first three letters
+MONTH_NUMBERS = {name[:3].lower(): i for i, name in enumerate(calendar.month_name) if name}
+
+
+def _month_numbers(month: pd.Series) -> pd.Series:
+    names = month.astype(str).str.strip()
+    numbers = names.str[:3].str.lower().map(MONTH_NUMBERS)
+    # Fall back to numeric months ("6", "06") where the name lookup missed
+    return numbers.fillna(pd.to_numeric(names, errors="coerce"))
+
+
+def parse_sales_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Standardize a raw CSV frame: rename columns, build ds, compact dtypes."""
+    df = df.rename(columns=COLUMN_RENAMES)
+    # Combine year and month into a date (ds) in one vectorized call
+    df["ds"] = pd.to_datetime(pd.DataFrame({
+        "year": df["year"],
+        "month": _month_numbers(df["month"]),
+        "day": 1,
+    }))
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype("category")
+    df["y"] = pd.to_numeric(df["y"], downcast="float")
+    df["year"] = pd.to_numeric(df["year"], downcast="integer")
+    return df
+
+
+def _sidecar_paths(path: str):
+    base = os.path.join(DATA_CACHE_DIR, os.path.basename(path))
+    return base + ".parquet", base + ".meta.json"
+
+
+def _source_signature(path: str) -> dict:
+    st = os.stat(path)
+    return {"path": os.path.abspath(path), "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def _read_sidecar(path: str, signature: dict):
+    data_path, meta_path = _sidecar_paths(path)
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+        offset = meta.pop("offset", None)
+        if meta != signature or offset is None:
+            return None
+        df = pd.read_parquet(data_path)
+        df.attrs["source_offset"] = offset
+        return df
+    except (OSError, ValueError, ImportError):
+        return None
+
+
+def _write_sidecar(path: str, df: pd.DataFrame, signature: dict):
+    data_path, meta_path = _sidecar_paths(path)
+    try:
+        os.makedirs(DATA_CACHE_DIR, exist_ok=True)
+        df.to_parquet(data_path + ".tmp", index=False)
+        os.replace(data_path + ".tmp", data_path)
+        with open(meta_path + ".tmp", "w") as f:
+            # offset: bytes of the CSV in df, short of size when it ends in a partial row
+            json.dump({**signature, "offset": df.attrs.get("source_offset", signature["size"])}, f)
+        os.replace(meta_path + ".tmp", meta_path)
+    except (OSError, ImportError, ValueError) as e:
+        # Parquet needs pyarrow/fastparquet; without it we just parse the CSV each start
+        print(f"[Warning] Could not write data sidecar: {e}")
+
+
+@span("load_data")
+def read_sales_data(path: str = DATA_PATH, use_sidecar: bool = True) -> pd.DataFrame:
+    """
+    Load the sales CSV into the columnar layout used everywhere else.
+    With use_sidecar the parsed frame is kept as Parquet under DATA_CACHE_DIR
+    and reused until the CSV's size or mtime changes.
+    """
+    signature = _source_signature(path)
+    df = _read_sidecar(path, signature) if use_sidecar else None
+    if df is None:
+        with open(path, "rb") as f:
+            data = f.read(signature["size"])
+        end = _complete_end(data)
+        df = parse_sales_frame(pd.read_csv(io.BytesIO(data[:end])))
+        df.attrs["source_offset"] = end
+        if use_sidecar:
+            _write_sidecar(path, df, signature)
     return df
 
+
+def _complete_end(data: bytes) -> int:
+    # End of the rows to parse from a whole file. A last row without a
+    # trailing newline is kept when it has every header field; a shorter
+    # one is still being written and is left for read_appended_rows.
+    end = data.rfind(b"\n") + 1
+    tail = data[end:]
+    if not end or not tail.strip():
+        return len(data)
+    fields = lambda line: len(next(csv.reader([line.decode("utf-8", "replace")])))
+    if fields(tail) == fields(data[:data.find(b"\n")]):
+        return len(data)
+    return end
+
+
+def read_appended_rows(path: str, offset: int):
+    """
+    Parse rows appended to path after byte offset. Returns (frame, new_offset);
+    only complete lines are consumed, so a half-written row is picked up on the
+    next call. frame is None when nothing new has been written.
+    """
+    if os.path.getsize(path) < offset:
+        raise ValueError(f"{path} shrank below offset {offset}; it was rewritten, not appended")
+    with open(path, "rb") as f:
+        header = f.readline()
+        f.seek(offset)
+        data = f.read()
+    end = data.rfind(b"\n") + 1
+    if end == 0:
+        return None, offset
+    frame = pd.read_csv(io.BytesIO(header + data[:end]))
+    return parse_sales_frame(frame), offset + end
+
+
+# Columns with more distinct values than this keep sorted row-id arrays
+# instead of one packed bitset per value, bounding index memory.
+BITSET_MAX_CARDINALITY = int(os.getenv("BITSET_MAX_CARDINALITY", "256"))
+
+
+def index_columns(df: pd.DataFrame) -> list:
+    """Columns a FilterIndex over df indexes: every categorical or string column."""
+    return [
+        col for col in df.columns
+        if isinstance(df[col].dtype, pd.CategoricalDtype) or pd.api.types.is_string_dtype(df[col].dtype)
+    ]
+
+
+class FilterIndex:
+    """
+    Inverted index over a loaded sales frame. Every value of every indexed
+    column maps to a packed row bitset (or a row-id array for high-cardinality
+    columns) and dates are pre-encoded as integer codes, so a filter becomes a
+    few bitwise ANDs/ORs plus a bincount with no intermediate DataFrames.
+    It answers filters on columns outside the SalesCube's dimensions (e.g.
+    Company or Sales Channel), alone or combined with cube columns.
+    """
+
+    def __init__(self, df: pd.DataFrame, columns=None):
+        self.df = df
+        columns = index_columns(df) if columns is None else columns
+        self.n_rows = len(df)
+        codes, dates = pd.factorize(df["ds"], sort=True)
+        self.date_codes = codes.astype(np.int32)
+        self.dates = dates
+        self.y = df["y"].to_numpy(dtype=np.float64)
+        self.columns = {}
+        for col in columns:
+            if col in df.columns:
+                self.columns[col] = self._index_column(df[col])
+
+    def _index_column(self, values: pd.Series) -> dict:
+        cat = values.astype("category")
+        codes = cat.cat.codes.to_numpy()
+        counts = np.bincount(codes[codes >= 0], minlength=len(cat.cat.categories))
+        order = np.argsort(codes, kind="stable")[np.count_nonzero(codes < 0):]
+        bounds = np.concatenate(([0], np.cumsum(counts)))
+        use_bitsets = len(cat.cat.categories) <= BITSET_MAX_CARDINALITY
+        entries = {}
+        for i, value in enumerate(cat.cat.categories):
+            if not counts[i]:
+                continue
+            rows = order[bounds[i]:bounds[i + 1]]
+            entries[str(value)] = self._pack(rows) if use_bitsets else rows
+        return {"bitsets": use_bitsets, "values": entries}
+
+    def _pack(self, rows: np.ndarray) -> np.ndarray:
+        mask = np.zeros(self.n_rows, dtype=bool)
+        mask[rows] = True
+        return np.packbits(mask)
+
+    def values(self, col: str) -> list:
+        return sorted(self.columns[col]["values"])
+
+    def mask(self, filters: dict):
+        """Packed bitset of rows matching all filters, or None for no filtering."""
+        mask = None
+        for col, values in (filters or {}).items():
+            if not values or col not in self.columns:
+                continue
+            entry = self.columns[col]
+            col_bits = np.zeros((self.n_rows + 7) // 8, dtype=np.uint8)
+            for value in values:
+                bits = entry["values"].get(str(value))
+                if bits is None:
+                    continue
+                if not entry["bitsets"]:
+                    bits = self._pack(bits)
+                np.bitwise_or(col_bits, bits, out=col_bits)
+            mask = col_bits if mask is None else np.bitwise_and(mask, col_bits, out=mask)
+        return mask
+
+    def aggregate(self, filters: dict) -> pd.DataFrame:
+        """Monthly ds/y sums over the rows matching filters."""
+        mask = self.mask(filters)
+        date_codes, y = self.date_codes, self.y
+        if mask is not None:
+            selected = np.unpackbits(mask, count=self.n_rows).view(bool)
+            date_codes, y = date_codes[selected], y[selected]
+        n_dates = len(self.dates)
+        sums = np.bincount(date_codes, weights=y, minlength=n_dates)
+        present = np.bincount(date_codes, minlength=n_dates) > 0
+        return pd.DataFrame({"ds": self.dates[present], "y": sums[present]})
+
+
+# Dimensions of the monthly revenue cube: every filter column plus Regional Manager
+CUBE_DIMENSIONS = CATEGORY_COLUMNS
+
+
+class SalesCube:
+    """
+    Materialized monthly revenue sums, one cell per distinct combination of
+    CUBE_DIMENSIONS values and ds. Any filter, including multi-value
+    selections, is answered by summing matching cells instead of scanning
+    rows. appended() folds new rows into a new cube without touching this one.
+    """
+
+    def __init__(self, df: pd.DataFrame, dims=CUBE_DIMENSIONS):
+        self.columns = set(df.columns)
+        self.dims = [col for col in dims if col in df.columns]
+        # Append-only value -> code dictionaries keep existing cell codes stable
+        self.codes = {col: {} for col in self.dims}
+        self.date_codes = {}
+        # (cell keys [n_cells, n_dims + 1], cell sums, dates by code)
+        self._state = (
+            np.empty((0, len(self.dims) + 1), dtype=np.int32),
+            np.empty(0, dtype=np.float64),
+            np.empty(0, dtype=df["ds"].dtype),
+        )
+        self._merge(df)
+
+    @classmethod
+    def from_state(cls, columns, dims, codes: dict, keys: np.ndarray, sums: np.ndarray, dates: np.ndarray) -> "SalesCube":
+        """Rebuild a cube from state() arrays and its code lists without re-aggregating any rows."""
+        cube = cls.__new__(cls)
+        cube.columns = set(columns)
+        cube.dims = list(dims)
+        cube.codes = {col: {value: i for i, value in enumerate(values)} for col, values in codes.items()}
+        cube.date_codes = {pd.Timestamp(d): i for i, d in enumerate(dates)}
+        cube._state = (keys, sums, dates)
+        return cube
+
+    def state(self):
+        """(cell keys, cell sums, dates by code); code lists are the codes dicts in insertion order."""
+        return self._state
+
+    def _encode(self, values: pd.Series, mapping: dict, key=str) -> np.ndarray:
+        local, uniques = pd.factorize(values)
+        lookup = np.array([mapping.setdefault(key(u), len(mapping)) for u in uniques], dtype=np.int32)
+        return np.where(local >= 0, lookup[local] if len(lookup) else -1, -1).astype(np.int32)
+
+    def _merge(self, rows: pd.DataFrame):
+        keys, sums, dates = self._state
+        row_keys = np.column_stack(
+            [self._encode(rows[col], self.codes[col]) for col in self.dims]
+            + [self._encode(rows["ds"], self.date_codes, key=pd.Timestamp)]
+        )
+        all_keys = np.concatenate([keys, row_keys])
+        weights = np.concatenate([sums, rows["y"].to_numpy(dtype=np.float64)])
+        cells, inverse = np.unique(all_keys, axis=0, return_inverse=True)
+        dates = np.array(list(self.date_codes), dtype=dates.dtype)
+        self._state = (cells, np.bincount(inverse.ravel(), weights=weights), dates)
+
+    def values(self, col: str) -> list:
+        return sorted(self.codes[col])
+
+    def covers(self, filters: dict) -> bool:
+        return all(
+            col in self.dims or col not in self.columns
+            for col, values in (filters or {}).items() if values
+        )
+
+    def aggregate(self, filters: dict) -> pd.DataFrame:
+        """Monthly ds/y sums over the cells matching filters."""
+        keys, sums, dates = self._state
+        selected = np.ones(len(keys), dtype=bool)
+        for col, values in (filters or {}).items():
+            if not values or col not in self.codes:
+                continue
+            mapping = self.codes[col]
+            wanted = [mapping[str(v)] for v in values if str(v) in mapping]
+            selected &= np.isin(keys[:, self.dims.index(col)], wanted)
+        date_codes = keys[selected, -1]
+        totals = np.bincount(date_codes, weights=sums[selected], minlength=len(dates))
+        present = np.bincount(date_codes, minlength=len(dates)) > 0
+        order = np.argsort(dates[present], kind="stable")
+        return pd.DataFrame({"ds": dates[present][order], "y": totals[present][order]})
+
+    def appended(self, rows: pd.DataFrame) -> "SalesCube":
+        """A new cube with rows folded in; existing codes keep their values."""
+        cube = copy.copy(self)
+        cube.codes = {col: dict(mapping) for col, mapping in self.codes.items()}
+        cube.date_codes = dict(self.date_codes)
+        cube._merge(rows)
+        return cube
+
+    def memory_usage(self) -> dict:
+        keys, sums, dates = self._state
+        dictionary_bytes = sum(
+            sys.getsizeof(mapping) + sum(sys.getsizeof(v) for v in mapping)
+            for mapping in [*self.codes.values(), self.date_codes]
+        )
+        return {
+            "cells": len(keys),
+            "array_bytes": int(keys.nbytes + sums.nbytes + dates.nbytes),
+            "dictionary_bytes": dictionary_bytes,
+        }
+
+
+def _append_frames(df: pd.DataFrame, rows: pd.DataFrame) -> pd.DataFrame:
+    # Align category sets first; concatenating differing categoricals falls back to object
+    rows = rows[df.columns]
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns:
+            categories = df[col].cat.categories.union(rows[col].cat.categories, sort=False)
+            df = df.assign(**{col: df[col].cat.set_categories(categories)})
+            rows = rows.assign(**{col: rows[col].cat.set_categories(categories)})
+    return pd.concat([df, rows], ignore_index=True)
+
+
+class Dataset:
+    """
+    One immutable version of the sales data: the frame plus the cube and
+    filter index derived from it. Reloads build a new Dataset and swap it in,
+    so a request that called load_data() keeps a consistent snapshot.
+    """
+
+    def __init__(self, df: pd.DataFrame, version: int = 1, cube: SalesCube = None):
+        self.df = df
+        self.version = version
+        self.source_offset = df.attrs.get("source_offset")
+        self.loaded_at = time.time()
+        self.cube = cube or SalesCube(df)
+        # Set when the frame and cube are mapped from a shared_data version
+        self.shared_path = None
+        self.index_columns = set(index_columns(df))
+        self._index = None
+        self._index_lock = threading.Lock()
+
+    def index_covers(self, filters: dict) -> bool:
+        # Checked before touching index, so a filter it cannot answer never builds it
+        return all(
+            col in self.index_columns or col not in self.df.columns
+            for col, values in (filters or {}).items() if values
+        )
+
+    @property
+    def index(self) -> FilterIndex:
+        # Row-level bitsets are built lazily per version, for the first filter the cube cannot answer
+        if self._index is None:
+            with self._index_lock:
+                if self._index is None:
+                    self._index = FilterIndex(self.df)
+        return self._index
+
+    def appended(self, rows: pd.DataFrame, offset: int) -> "Dataset":
+        df = _append_frames(self.df, rows)
+        df.attrs["source_offset"] = offset
+        return Dataset(df, self.version + 1, self.cube.appended(rows))
+
+    def info(self) -> dict:
+        return {"version": self.version, "rows": len(self.df), "source_offset": self.source_offset,
+                "loaded_at": self.loaded_at, "shared_path": self.shared_path}
+
+
+# Seconds between checks of DATA_PATH for appended rows; 0 disables the watcher
+DATA_RELOAD_INTERVAL = float(os.getenv("DATA_RELOAD_INTERVAL", "5"))
+# Superseded versions kept so in-flight requests still get the cube and index
+DATASET_HISTORY = 2
+_datasets = []
+_dataset_lock = threading.Lock()
+
+
+def get_dataset() -> Dataset:
+    if not _datasets:
+        with _dataset_lock:
+            if not _datasets:
+                if SHARED_DATA_DIR:
+                    from shared_data import load_shared
+                    _datasets.append(load_shared(DATA_PATH))
+                else:
+                    _datasets.append(Dataset(read_sales_data(DATA_PATH)))
+    return _datasets[-1]
+
+
+def load_data() -> pd.DataFrame:
+    return get_dataset().df
+
+
+def _dataset_for(df: pd.DataFrame):
+    # The cube and index describe one dataset version; other frames use pandas
+    for dataset in reversed(_datasets):
+        if dataset.df is df:
+            return dataset
+    return None
+
+
+def _swap_dataset(dataset: Dataset):
+    # Caller holds _dataset_lock
+    _datasets.append(dataset)
+    del _datasets[:-DATASET_HISTORY]
+
+
+def _install_dataset(dataset: Dataset):
+    # Caller holds _dataset_lock; a copy of the current version (e.g. its
+    # shared mapping) replaces it rather than pushing it into the history
+    if _datasets and _datasets[-1].version == dataset.version:
+        _datasets[-1] = dataset
+    else:
+        _swap_dataset(dataset)
+
+
+def reload_data(path: str = DATA_PATH) -> dict:
+    """
+    Fold rows appended to path since the current version into a new dataset
+    version and swap it in. Only the new bytes are parsed; a file that shrank
+    was rewritten, so it is reparsed in full. Fit cache entries whose filters
+    match any new row are dropped; everything else stays warm. With
+    SHARED_DATA_DIR the reload is coordinated with the other workers.
+    """
+    if SHARED_DATA_DIR:
+        from shared_data import sync_shared
+        get_dataset()
+        result = sync_shared(path, block=True)
+        return result or {**get_dataset().info(), "rows_added": 0, "full_reload": False}
+    return _reload_local(path)
+
+
+@span("reload_data")
+def _reload_local(path: str) -> dict:
+    with _dataset_lock:
+        current = _datasets[-1] if _datasets else None
+        if current is None or current.source_offset is None:
+            rows = None
+        else:
+            try:
+                rows, offset = read_appended_rows(path, current.source_offset)
+            except ValueError as e:
+                print(f"[Warning] {e}; reloading it in full")
+                rows = offset = None
+                current = None
+        if current is None:
+            dataset = Dataset(read_sales_data(path), _datasets[-1].version + 1 if _datasets else 1)
+            _swap_dataset(dataset)
+            clear_fit_cache()
+            return {**dataset.info(), "rows_added": len(dataset.df), "full_reload": True}
+        if rows is None:
+            return {**current.info(), "rows_added": 0, "full_reload": False}
+        dataset = current.appended(rows, offset)
+        _swap_dataset(dataset)
+    invalidated = invalidate_fit_cache(rows)
+    if offset == os.path.getsize(path):
+        # Keep the parquet sidecar current so the next start skips the CSV
+        _write_sidecar(path, dataset.df, _source_signature(path))
+    return {**dataset.info(), "rows_added": len(rows), "full_reload": False, "fit_cache_invalidated": invalidated}
+
+
+async def run_data_watcher(path: str = DATA_PATH, interval: float = DATA_RELOAD_INTERVAL, on_reload=None):
+    """
+    Background task: reload whenever path's size moves away from the loaded
+    offset. With SHARED_DATA_DIR every worker runs it to follow the versions
+    published by whichever worker did the reload. on_reload runs in every
+    worker that picked up new rows, loader or follower; work that must run
+    once across workers has to gate itself.
+    """
+    if interval <= 0:
+        return
+    if SHARED_DATA_DIR:
+        from shared_data import sync_shared
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            # The first load (or warmup's, which holds _dataset_lock) must not block the event loop
+            dataset = await asyncio.to_thread(get_dataset)
+            if SHARED_DATA_DIR:
+                result = await asyncio.to_thread(sync_shared, path)
+            elif os.path.getsize(path) != dataset.source_offset:
+                result = await asyncio.to_thread(reload_data, path)
+            else:
+                result = None
+            if result and result["rows_added"] and on_reload is not None:
+                await on_reload(result)
+        except Exception as e:
+            print(f"[Warning] Data reload failed: {e}")
+
+
+def _dataset_metrics():
+    if not _datasets:
+        return []
+    dataset = _datasets[-1]
+    return [
+        ("sales_dataset_version", "gauge", "Dataset version this worker serves.", [({}, dataset.version)]),
+        ("sales_dataset_rows", "gauge", "Rows in the served dataset version.", [({}, len(dataset.df))]),
+    ]
+
+
+REGISTRY.add_collector(_dataset_metrics)
+
+
+def get_sales_cube() -> SalesCube:
+    return get_dataset().cube
+
+
 def get_unique_filters():
-    df = load_data()
-    unique_filters = {}
-    for col in FILTER_COLUMNS:
-        unique_filters[col] = sorted(df[col].dropna().unique().tolist())
-    return unique_filters
+    # The cube's code dictionaries list every value present, so this needs no row index
+    cube = get_sales_cube()
+    return {col: cube.values(col) for col in FILTER_COLUMNS if col in cube.codes}
+
 
+@span("filter_sales_data")
 def filter_sales_data(df: pd.DataFrame, filters: dict) -> pd.DataFrame:
+    dataset = _dataset_for(df)
+    if dataset is not None and dataset.cube.covers(filters):
+        return dataset.cube.aggregate(filters)
+    if dataset is not None and dataset.index_covers(filters):
+        return dataset.index.aggregate(filters)
     # Apply dynamic filters (supporting multiple selections)
     for col, values in (filters or {}).items():
         if col in df.columns and values:
             df = df[df[col].isin(values)]
-    # Aggregate by ds and sum y
-    agg_df = df.groupby("ds", as_index=False)["y"].sum()
+    # y is stored as float32; sum in float64 so totals keep their precision
+    agg_df = df["y"].astype("float64").groupby(df["ds"]).sum().reset_index()
     return agg_df
 
 
-def forecast_sales(df: pd.DataFrame, periods: int = 30) -> pd.DataFrame:
-    from prophet import Prophet
-    # Prophet expects columns: ds (datetime), y (float)
-    model = Prophet()
-    model.fit(df)
-    future = model.make_future_dataframe(periods=periods)
-    forecast = model.predict(future)
-    return forecast[["ds", "yhat", "yhat_lower", "yhat_upper"]].tail(periods)
+# Requested period types and the pandas frequency each one maps to; "years"
+# is served as 12 months per year.
+PERIOD_FREQUENCIES = {"days": "D", "weeks": "W", "months": "MS"}
+# Nominal length of a frequency in days, used to pick the coarser of two
+FREQUENCY_DAYS = {"D": 1, "W": 7, "M": 30.4, "Q": 91.3, "Y": 365.2}
 
 
-import matplotlib.pyplot as plt
-import base64
-import io
-import os
+def validate_period_type(period_type: str) -> str:
+    period_type = (period_type or "days").lower()
+    if period_type != "years" and period_type not in PERIOD_FREQUENCIES:
+        raise ValueError(f"Unknown period_type {period_type!r}; expected days, weeks, months or years")
+    return period_type
 
-def prophet_plot(df: pd.DataFrame, periods: int = 30) -> str:
-    from prophet import Prophet
-    model = Prophet()
-    model.fit(df)
-    future = model.make_future_dataframe(periods=periods)
-    forecast = model.predict(future)
-    fig = model.plot(forecast)
-    buf = io.BytesIO()
-    fig.savefig(buf, format="png", dpi=60)
-    plt.close(fig)
-    buf.seek(0)
-    b64 = base64.b64encode(buf.read()).decode()
-    # Save to file for /plots endpoint
-    os.makedirs("plots", exist_ok=True)
-    fname = f"plots/plot_{hash(str(df.head()))}_{periods}.b64"
-    with open(fname, "w") as f:
-        f.write(b64)
-    return b64
-
-
-def prophet_components(df: pd.DataFrame, periods: int = 30) -> str:
-    from prophet import Prophet
-    model = Prophet()
-    model.fit(df)
-    future = model.make_future_dataframe(periods=periods)
-    forecast = model.predict(future)
-    fig = model.plot_components(forecast)
+
+def validate_periods(periods) -> int:
+    periods = 30 if periods is None else int(periods)
+    if periods < 1:
+        raise ValueError(f"periods must be a positive integer, got {periods}")
+    return periods
+
+
+def _frequency_days(freq: str) -> float:
+    return FREQUENCY_DAYS.get(freq.lstrip("0123456789")[:1].upper(), 1)
+
+
+def forecast_horizon(df: pd.DataFrame, periods: int = 30, period_type: str = "days"):
+    """
+    Map a (periods, period_type) request onto the series: returns
+    (series, freq, steps) where series is df resampled to freq and steps is the
+    number of freq rows needed to cover the horizon. The model never runs finer
+    than the data, so 30 days of monthly sales is one monthly step rather than
+    30 daily extrapolations.
+    """
+    from forecast_backends import series_frequency, future_dates
+    period_type = validate_period_type(period_type)
+    periods = validate_periods(periods)
+    if period_type == "years":
+        period_type, periods = "months", periods * 12
+    native = series_frequency(df["ds"])
+    requested = PERIOD_FREQUENCIES[period_type]
+    freq = requested if _frequency_days(requested) > _frequency_days(native) else native
+    series = df
+    if freq != native:
+        series = df.set_index("ds")["y"].resample(freq).sum().reset_index()
+    last = series["ds"].max()
+    end = last + pd.DateOffset(**{period_type: periods})
+    steps = max(len(pd.date_range(last, end, freq=freq)) - 1, 1)
+    if future_dates(last, steps, freq)[-1] < end:
+        steps += 1
+    return series, freq, steps
+
+
+# Fitted models and their in-sample + future forecast, shared by /forecast, /plot,
+# /components and the GenAI endpoints so one filter set costs one fit per backend
+# and frequency. Entries are keyed independently of the horizon: a longer
+# request extends the cached forecast and shorter ones slice it.
+FIT_CACHE_SIZE = int(os.getenv("FIT_CACHE_SIZE", "64"))
+_fit_cache = OrderedDict()
+# key -> normalized filters of the series it was fitted on, for invalidate_fit_cache
+_fit_cache_filters = {}
+_fit_cache_lock = threading.Lock()
+# key -> Future of the fit running for it, awaited by sync and async callers alike
+_fit_inflight = {}
+_fit_cache_stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+
+def normalize_filters(filters: dict) -> dict:
+    # Drop empty selections and sort columns/values so equivalent filters hash alike
+    return {
+        col: sorted({str(v) for v in values})
+        for col, values in sorted((filters or {}).items())
+        if values
+    }
+
+
+def series_digest(df: pd.DataFrame) -> str:
+    """Stable content digest of an aggregated ds/y series."""
+    hashed = pd.util.hash_pandas_object(df[["ds", "y"]], index=False)
+    return hashlib.sha256(hashed.values.tobytes()).hexdigest()
+
+
+def fit_cache_key(df: pd.DataFrame, freq: str, filters: dict = None, backend: str = None) -> str:
+    payload = json.dumps({
+        "filters": normalize_filters(filters),
+        "series": series_digest(df),
+        "freq": freq,
+        "backend": validate_backend(backend),
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _future_rows(forecast: pd.DataFrame, df: pd.DataFrame) -> pd.Series:
+    return forecast["ds"] > df["ds"].max()
+
+
+def _covers(entry, df: pd.DataFrame, steps: int) -> bool:
+    return entry is not None and _future_rows(entry[1], df).sum() >= steps
+
+
+def _trim_forecast(forecast: pd.DataFrame, df: pd.DataFrame, steps: int) -> pd.DataFrame:
+    # In-sample rows plus the first steps future rows
+    future = _future_rows(forecast, df)
+    return forecast[~future | (future.cumsum() <= steps)]
+
+
+def _fit_cache_get(key: str, df: pd.DataFrame, steps: int):
+    # Caller holds _fit_cache_lock; an entry too short for steps is a miss
+    entry = _fit_cache.get(key)
+    if not _covers(entry, df, steps):
+        return None
+    _fit_cache.move_to_end(key)
+    _fit_cache_stats["hits"] += 1
+    return entry
+
+
+def _fit_cache_put(key: str, entry, filters: dict = None):
+    with _fit_cache_lock:
+        _fit_cache[key] = entry
+        _fit_cache_filters[key] = normalize_filters(filters)
+        while len(_fit_cache) > FIT_CACHE_SIZE:
+            evicted, _ = _fit_cache.popitem(last=False)
+            _fit_cache_filters.pop(evicted, None)
+            _fit_cache_stats["evictions"] += 1
+
+
+def _claim_fit(key: str, df: pd.DataFrame, steps: int):
+    """
+    (entry, None, None) on a cache hit. Otherwise (None, future, claimed): the
+    Future of the fit in flight for key, and, when this caller started it,
+    claimed = (model to extend or None,) and the caller must _release_fit it.
+    """
+    with _fit_cache_lock:
+        entry = _fit_cache_get(key, df, steps)
+        if entry is not None:
+            return entry, None, None
+        future = _fit_inflight.get(key)
+        if future is not None:
+            return None, future, None
+        _fit_cache_stats["misses"] += 1
+        future = _fit_inflight[key] = Future()
+        cached = _fit_cache.get(key)
+        return None, future, (cached[0] if cached else None,)
+
+
+def _release_fit(key: str, future: Future, filters: dict = None, entry=None, error: BaseException = None):
+    # Cache the entry before waking waiters so none of them misses it
+    if error is None:
+        _fit_cache_put(key, entry, filters)
+    with _fit_cache_lock:
+        if _fit_inflight.get(key) is future:
+            del _fit_inflight[key]
+    if error is None:
+        future.set_result(entry)
+    elif isinstance(error, Exception):
+        future.set_exception(error)
+    else:
+        # The fitting caller was cancelled or interrupted: waiters start their own fit
+        future.cancel()
+
+
+def _waited_fit(future: Future, df: pd.DataFrame, steps: int):
+    """A finished in-flight fit's entry if it covers steps, None to look again; raises its error."""
+    if future.cancelled():
+        return None
+    entry = future.result()
+    return entry if _covers(entry, df, steps) else None
+
+
+def _fit_and_predict(df: pd.DataFrame, steps: int, freq: str, backend: str = "prophet", model=None):
+    # Top-level so it can run in a forecast worker process. A cached Prophet
+    # model is passed back in to extend its forecast without refitting.
+    if backend != "prophet":
+        from forecast_backends import batch_forecast
+        return batch_forecast([df], steps, backend, freq)[0]
+    if model is None:
+        from prophet import Prophet
+        # Prophet expects columns: ds (datetime), y (float)
+        model = Prophet()
+        with span("prophet_fit"):
+            model.fit(df)
+    future = model.make_future_dataframe(periods=steps, freq=freq)
+    with span("prophet_predict"):
+        forecast = model.predict(future)
+    return model, forecast
+
+
+def fit_forecast(df: pd.DataFrame, periods: int = 30, filters: dict = None, backend: str = None,
+                 period_type: str = "days"):
+    """
+    Return (model, forecast) for df over the requested horizon, fitting the
+    backend only on a cache miss. The cache is LRU-bounded by FIT_CACHE_SIZE;
+    concurrent requests for the same key wait for a single fit instead of
+    running their own.
+    """
+    backend = validate_backend(backend)
+    series, freq, steps = forecast_horizon(df, periods, period_type)
+    key = fit_cache_key(series, freq, filters, backend)
+    entry = None
+    while entry is None:
+        entry, future, claimed = _claim_fit(key, series, steps)
+        if entry is not None:
+            break
+        if claimed is None:
+            try:
+                future.result()
+            except FutureCancelledError:
+                pass
+            entry = _waited_fit(future, series, steps)
+            continue
+        try:
+            entry = _fit_and_predict(series, steps, freq, backend, claimed[0])
+        except BaseException as e:
+            _release_fit(key, future, error=e)
+            raise
+        _release_fit(key, future, filters, entry)
+    return entry[0], _trim_forecast(entry[1], series, steps)
+
+
+def fit_cache_info() -> dict:
+    with _fit_cache_lock:
+        return {**_fit_cache_stats, "size": len(_fit_cache), "maxsize": FIT_CACHE_SIZE}
+
+
+def clear_fit_cache():
+    with _fit_cache_lock:
+        _fit_cache.clear()
+        _fit_cache_filters.clear()
+
+
+def _fit_cache_metrics():
+    info = fit_cache_info()
+    return [
+        ("sales_fit_cache_requests_total", "counter", "Forecast fit cache lookups by result.",
+         [({"result": "hit"}, info["hits"]), ({"result": "miss"}, info["misses"])]),
+        ("sales_fit_cache_evictions_total", "counter", "Fits evicted from the LRU fit cache.", [({}, info["evictions"])]),
+        ("sales_fit_cache_entries", "gauge", "Fits currently cached.", [({}, info["size"])]),
+    ]
+
+
+REGISTRY.add_collector(_fit_cache_metrics)
+
+
+def _rows_match(rows: pd.DataFrame, filters: dict) -> bool:
+    mask = np.ones(len(rows), dtype=bool)
+    for col, values in filters.items():
+        if col in rows.columns:
+            mask &= rows[col].astype(str).isin(values).to_numpy()
+    return bool(mask.any())
+
+
+def invalidate_fit_cache(rows: pd.DataFrame) -> int:
+    """Drop cached fits whose series includes any of rows; returns how many were dropped."""
+    with _fit_cache_lock:
+        stale = [key for key, filters in _fit_cache_filters.items() if _rows_match(rows, filters)]
+        for key in stale:
+            _fit_cache.pop(key, None)
+            _fit_cache_filters.pop(key, None)
+    return len(stale)
+
+
+def _forecast_tail(forecast: pd.DataFrame, df: pd.DataFrame, steps: int) -> pd.DataFrame:
+    future = forecast[_future_rows(forecast, df)]
+    return future[["ds", "yhat", "yhat_lower", "yhat_upper"]].head(steps)
+
+
+def forecast_sales(df: pd.DataFrame, periods: int = 30, filters: dict = None, backend: str = None,
+                   period_type: str = "days") -> pd.DataFrame:
+    series, _, steps = forecast_horizon(df, periods, period_type)
+    _, forecast = fit_forecast(df, periods, filters, backend, period_type)
+    return _forecast_tail(forecast, series, steps)
+
+
+async def aforecast_sales(df: pd.DataFrame, periods: int = 30, filters: dict = None, backend: str = None,
+                          period_type: str = "days") -> pd.DataFrame:
+    """
+    forecast_sales for async handlers: a Prophet cache miss is fitted in the
+    forecast process pool, once per key however many requests wait for it.
+    """
+    backend = validate_backend(backend)
+    if backend != "prophet":
+        # Closed-form backends take milliseconds; no need to leave the event loop
+        return forecast_sales(df, periods, filters, backend, period_type)
+    series, freq, steps = forecast_horizon(df, periods, period_type)
+    key = fit_cache_key(series, freq, filters, backend)
+    entry = None
+    while entry is None:
+        entry, future, claimed = _claim_fit(key, series, steps)
+        if entry is not None:
+            break
+        if claimed is None:
+            # shield: a cancelled waiter must not cancel the fit others wait for
+            try:
+                await asyncio.shield(asyncio.wrap_future(future))
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+            entry = _waited_fit(future, series, steps)
+            continue
+        try:
+            # Spans inside the worker process are not collected; time the round trip here
+            with span("forecast_pool"):
+                entry = await run_in_forecast_pool(_fit_and_predict, series, steps, freq, backend, claimed[0])
+        except BaseException as e:
+            _release_fit(key, future, error=e)
+            raise
+        _release_fit(key, future, filters, entry)
+    return _forecast_tail(entry[1], series, steps)
+
+
+# Process pool for batch (per-segment) forecasting. Prophet fits are CPU-bound
+# and hold the GIL, so segments are fitted in separate processes.
+FORECAST_WORKERS = int(os.getenv("FORECAST_WORKERS", "0")) or os.cpu_count() or 1
+# "spawn" keeps workers independent of the server's threads and Stan state
+FORECAST_START_METHOD = os.getenv("FORECAST_START_METHOD", "spawn")
+_forecast_pool = None
+_forecast_pool_lock = threading.Lock()
+
+
+def _init_forecast_worker():
+    # Pay Prophet's import once per worker at start-up rather than in its first fit
+    try:
+        import prophet  # noqa: F401
+    except ImportError:
+        pass
+
+
+def get_forecast_pool() -> ProcessPoolExecutor:
+    global _forecast_pool
+    with _forecast_pool_lock:
+        if _forecast_pool is None:
+            _forecast_pool = ProcessPoolExecutor(
+                max_workers=FORECAST_WORKERS,
+                mp_context=multiprocessing.get_context(FORECAST_START_METHOD),
+                initializer=_init_forecast_worker,
+            )
+        return _forecast_pool
+
+
+def _discard_forecast_pool(pool: ProcessPoolExecutor):
+    # A dead worker leaves the executor broken for good; the next caller starts a fresh one
+    global _forecast_pool
+    with _forecast_pool_lock:
+        if _forecast_pool is pool:
+            _forecast_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def call_in_forecast_pool(fn, *args):
+    """Blocking fn(*args) in the forecast pool, retried once on a fresh pool if the current one is broken."""
+    for attempt in range(2):
+        pool = get_forecast_pool()
+        try:
+            return pool.submit(fn, *args).result()
+        except BrokenProcessPool:
+            _discard_forecast_pool(pool)
+            if attempt:
+                raise
+
+
+async def run_in_forecast_pool(fn, *args):
+    """Awaitable call_in_forecast_pool."""
+    loop = asyncio.get_running_loop()
+    for attempt in range(2):
+        pool = get_forecast_pool()
+        try:
+            return await loop.run_in_executor(pool, fn, *args)
+        except BrokenProcessPool:
+            print("[Warning] Forecast process pool is broken; restarting it")
+            _discard_forecast_pool(pool)
+            if attempt:
+                raise
+
+
+def shutdown_forecast_pool():
+    global _forecast_pool
+    with _forecast_pool_lock:
+        if _forecast_pool is not None:
+            _forecast_pool.shutdown(cancel_futures=True)
+            _forecast_pool = None
+
+
+def segment_series(df: pd.DataFrame, col: str, val, periods: int, period_type: str):
+    """(series, freq, steps) for one (col, value) segment, or None when it has no rows."""
+    series = filter_sales_data(df, {col: [val]})
+    if series.empty:
+        return None
+    return forecast_horizon(series, periods, period_type)
+
+
+def _segment_jobs(df: pd.DataFrame, segments, periods: int, period_type: str, backend: str):
+    # Aggregate each (col, value) segment up front; empty segments are skipped
+    for col, val in segments:
+        job = segment_series(df, col, val, periods, period_type)
+        if job is not None:
+            series, freq, steps = job
+            yield col, val, series, freq, steps, fit_cache_key(series, freq, {col: [val]}, backend)
+
+
+async def aforecast_segments(df: pd.DataFrame, segments, periods: int = 30, max_workers: int = None,
+                             return_exceptions: bool = False, backend: str = None, period_type: str = "days"):
+    """
+    Forecast many (group column, value) segments in parallel.
+
+    Cached fits are yielded immediately; the rest are fitted across the
+    forecast process pool with at most max_workers (default FORECAST_WORKERS)
+    in flight, and yielded as (col, value, forecast_df) in completion order so
+    callers can start consuming results while other segments are still fitting.
+    With return_exceptions a failed fit yields its exception in place of the
+    frame instead of aborting the remaining segments. NumPy backends fit the
+    misses in batched passes (one per shared date grid) instead of using the pool.
+    """
+    backend = validate_backend(backend)
+    limit = max_workers or FORECAST_WORKERS
+    # Aggregating every segment is row work; keep it off the event loop
+    jobs = await asyncio.to_thread(lambda: list(_segment_jobs(df, segments, periods, period_type, backend)))
+    # Misses go through the in-flight map like aforecast_sales: a segment
+    # another request is already fitting is awaited, not fitted again
+    queue = []    # (job, in-flight Future, model to extend) this call fits
+    running = {}  # pool/batch task -> ([(job, in-flight Future)], submitted at)
+    waiting = {}  # shielded wait -> (job, in-flight Future of another caller)
+
+    def claim(job):
+        entry, future, claimed = _claim_fit(job[5], job[2], job[4])
+        if entry is None and claimed is None:
+            # shield: stopping early must not cancel a fit others wait for
+            waiting[asyncio.shield(asyncio.wrap_future(future))] = (job, future)
+        elif entry is None:
+            queue.append((job, future, claimed[0]))
+        return entry
+
+    try:
+        for job in jobs:
+            entry = claim(job)
+            if entry is not None:
+                yield job[0], job[1], _forecast_tail(entry[1], job[2], job[4])
+        queue.reverse()
+        while queue or running or waiting:
+            if backend != "prophet":
+                from forecast_backends import batch_forecast
+                batches = {}
+                while queue:
+                    job, future, _ = queue.pop()
+                    batches.setdefault(job[3], []).append((job, future))
+                for freq, batch in batches.items():
+                    steps = max(job[4] for job, _ in batch)
+                    task = asyncio.ensure_future(asyncio.to_thread(
+                        batch_forecast, [job[2] for job, _ in batch], steps, backend, freq))
+                    running[task] = (batch, None)
+            while queue and len(running) < limit:
+                job, future, model = queue.pop()
+                task = asyncio.ensure_future(run_in_forecast_pool(_fit_and_predict, job[2], job[4], job[3], backend, model))
+                running[task] = ([(job, future)], time.perf_counter())
+            done, _ = await asyncio.wait([*running, *waiting], return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task in waiting:
+                    job, future = waiting.pop(task)
+                    try:
+                        entry = _waited_fit(future, job[2], job[4])
+                    except Exception as e:
+                        if not return_exceptions:
+                            raise
+                        yield job[0], job[1], e
+                        continue
+                    # A cancelled or too short fit is claimed again, by this call if nobody else has
+                    entry = entry if entry is not None else claim(job)
+                    if entry is not None:
+                        yield job[0], job[1], _forecast_tail(entry[1], job[2], job[4])
+                    continue
+                batch, submitted = running.pop(task)
+                if submitted is not None:
+                    record("forecast_pool", time.perf_counter() - submitted)
+                try:
+                    outcome = task.result()
+                except Exception as e:
+                    for job, future in batch:
+                        _release_fit(job[5], future, error=e)
+                    if not return_exceptions:
+                        raise
+                    for job, _ in batch:
+                        yield job[0], job[1], e
+                    continue
+                entries = outcome if submitted is None else [outcome]
+                # Release the whole batch before yielding, in case the consumer stops early
+                for (job, future), entry in zip(batch, entries):
+                    _release_fit(job[5], future, {job[0]: [job[1]]}, entry)
+                for (job, _), entry in zip(batch, entries):
+                    yield job[0], job[1], _forecast_tail(entry[1], job[2], job[4])
+    finally:
+        # Consumer stopped early or a fit failed: drop fits that have not
+        # finished and hand their keys over to whoever else is waiting
+        for task in [*running, *waiting]:
+            task.cancel()
+        claimed = [(job, future) for job, future, _ in queue]
+        claimed += [pair for batch, _ in running.values() for pair in batch]
+        for job, future in claimed:
+            if not future.done():
+                _release_fit(job[5], future, error=asyncio.CancelledError())
+
+
+def _scenario_jobs(df: pd.DataFrame, scenarios):
+    # (per-scenario (key, series, freq, steps) or None, fit groups by series key)
+    jobs = []
+    groups = {}
+    for scenario in scenarios:
+        series = filter_sales_data(df, scenario.get("filters") or {})
+        if series.empty:
+            jobs.append(None)
+            continue
+        backend = validate_backend(scenario.get("backend"))
+        series, freq, steps = forecast_horizon(series, scenario.get("periods", 30), scenario.get("period_type", "days"))
+        # Fits are shared by series; cache entries are keyed by filters as /forecast keys them
+        key = fit_cache_key(series, freq, None, backend)
+        jobs.append((key, series, freq, steps))
+        group = groups.setdefault(key, {"series": series, "freq": freq, "backend": backend, "steps": 0,
+                                        "cache_keys": {}})
+        group["steps"] = max(group["steps"], steps)
+        group["cache_keys"][fit_cache_key(series, freq, scenario.get("filters"), backend)] = scenario.get("filters")
+    return jobs, groups
+
+
+def _claim_group(group: dict, owned: list):
+    """
+    Claim a scenario group's cache keys. Returns (entry, None) on a hit, after
+    caching it under keys claimed on the way; otherwise (None, Future of a fit
+    another caller has in flight or None), appending (cache key, filters,
+    Future) to owned for each key this caller must fit and _release_fit.
+    """
+    flight = None
+    group["model"] = None
+    for cache_key, filters in group["cache_keys"].items():
+        entry, future, claimed = _claim_fit(cache_key, group["series"], group["steps"])
+        if entry is not None:
+            for owned_key, owned_filters, owned_future in owned:
+                _release_fit(owned_key, owned_future, owned_filters, entry)
+            owned.clear()
+            return entry, None
+        if claimed is None:
+            flight = flight or future
+        else:
+            owned.append((cache_key, filters, future))
+            if group["model"] is None:
+                group["model"] = claimed[0]
+    return None, flight
+
+
+async def aforecast_scenarios(df: pd.DataFrame, scenarios, max_workers: int = None) -> list:
+    """
+    Forecast many scenarios (dicts with filters, periods, period_type and
+    backend) in one pass. Scenarios whose filters aggregate to the same series
+    share one fit at the longest horizon any of them asks for, cached under
+    each scenario's own /forecast key; Prophet misses run in parallel on the
+    forecast pool and NumPy misses are fitted in batches of series on the
+    same date grid. Returns one forecast frame per scenario
+    (with its row frequency in attrs["freq"]), None where the filters match
+    no rows, or the exception its fit raised.
+    """
+    jobs, groups = await asyncio.to_thread(_scenario_jobs, df, scenarios)
+
+    limit = asyncio.Semaphore(max_workers or FORECAST_WORKERS)
+
+    async def fit_one(key):
+        group = groups[key]
+        async with limit:
+            with span("forecast_pool"):
+                return await run_in_forecast_pool(
+                    _fit_and_predict, group["series"], group["steps"], group["freq"], "prophet", group["model"],
+                )
+
+    async def fit_batch(backend, freq, keys):
+        from forecast_backends import batch_forecast
+        steps = max(groups[key]["steps"] for key in keys)
+        # batch_forecast only stacks the series that share a date grid
+        return await asyncio.to_thread(batch_forecast, [groups[key]["series"] for key in keys], steps, backend, freq)
+
+    async def wait_for(key, future):
+        # shield: a cancelled request must not cancel the fit others wait for
+        try:
+            await asyncio.shield(asyncio.wrap_future(future))
+        except asyncio.CancelledError:
+            if not future.cancelled():
+                raise
+        return _waited_fit(future, groups[key]["series"], groups[key]["steps"])
+
+    # Each group claims its cache keys through the in-flight map, like
+    # aforecast_sales: a group another request is fitting is awaited, and
+    # one whose awaited fit was cancelled or too short is claimed again
+    entries = {}
+    owned = {}
+    unresolved = list(groups)
+    try:
+        while unresolved:
+            prophet_misses, batches, waiters = [], {}, {}
+            for key in unresolved:
+                entry, flight = _claim_group(groups[key], owned.setdefault(key, []))
+                if entry is not None:
+                    entries[key] = entry
+                elif not owned[key]:
+                    waiters[key] = flight
+                elif groups[key]["backend"] == "prophet":
+                    prophet_misses.append(key)
+                else:
+                    batches.setdefault((groups[key]["backend"], groups[key]["freq"]), []).append(key)
+
+            fits = [fit_one(key) for key in prophet_misses] + [fit_batch(b, f, keys) for (b, f), keys in batches.items()]
+            fits += [wait_for(key, future) for key, future in waiters.items()]
+            outcomes = await asyncio.gather(*fits, return_exceptions=True)
+            fitted = {key: outcome for key, outcome in zip(prophet_misses, outcomes)}
+            for keys, outcome in zip(batches.values(), outcomes[len(prophet_misses):]):
+                for i, key in enumerate(keys):
+                    fitted[key] = outcome if isinstance(outcome, BaseException) else outcome[i]
+            for key, entry in fitted.items():
+                entries[key] = entry
+                for cache_key, filters, future in owned.pop(key):
+                    if isinstance(entry, BaseException):
+                        _release_fit(cache_key, future, error=entry)
+                    else:
+                        _release_fit(cache_key, future, filters, entry)
+            unresolved = []
+            for key, outcome in zip(waiters, outcomes[len(outcomes) - len(waiters):]):
+                if outcome is None:
+                    unresolved.append(key)
+                else:
+                    entries[key] = outcome
+    finally:
+        for claims in owned.values():
+            for cache_key, _, future in claims:
+                if not future.done():
+                    _release_fit(cache_key, future, error=asyncio.CancelledError())
+
+    results = []
+    for job in jobs:
+        if job is None:
+            results.append(None)
+            continue
+        key, series, freq, steps = job
+        entry = entries[key]
+        if isinstance(entry, BaseException):
+            results.append(entry)
+            continue
+        forecast_df = _forecast_tail(entry[1], series, steps)
+        forecast_df.attrs["freq"] = freq
+        results.append(forecast_df)
+    return results
+
+
+def _figure_png(fig) -> bytes:
+    # matplotlib is only needed for PNG exports, so it is imported on first render
+    import matplotlib.pyplot as plt
     buf = io.BytesIO()
-    fig.savefig(buf, format="png", dpi=60)
+    with span("render_png"):
+        fig.savefig(buf, format="png", dpi=60)
     plt.close(fig)
-    buf.seek(0)
-    b64 = base64.b64encode(buf.read()).decode()
-    # Save to file for /plots endpoint
-    os.makedirs("plots", exist_ok=True)
-    fname = f"plots/components_{hash(str(df.head()))}_{periods}.b64"
-    with open(fname, "w") as f:
-        f.write(b64)
-    return b64
+    return buf.getvalue()
+
+
+def _frame_figure(df: pd.DataFrame, forecast: pd.DataFrame, kind: str):
+    # Prophet-style figures for backends without their own plotting
+    import matplotlib.pyplot as plt
+    if kind == "components":
+        columns = [c for c in ("trend", "yearly") if c in forecast.columns] or ["yhat"]
+        fig, axes = plt.subplots(len(columns), 1, figsize=(9, 3 * len(columns)), squeeze=False)
+        for ax, col in zip(axes[:, 0], columns):
+            ax.plot(forecast["ds"], forecast[col], color="#0072B2")
+            ax.set_ylabel(col)
+        return fig
+    fig, ax = plt.subplots(figsize=(10, 6))
+    ax.plot(df["ds"], df["y"], "k.")
+    ax.plot(forecast["ds"], forecast["yhat"], color="#0072B2")
+    ax.fill_between(forecast["ds"], forecast["yhat_lower"], forecast["yhat_upper"], color="#0072B2", alpha=0.2)
+    ax.set_xlabel("ds")
+    ax.set_ylabel("y")
+    return fig
+
+
+def _stored_plot(df: pd.DataFrame, periods: int, filters: dict, kind: str, backend: str = None,
+                 period_type: str = "days") -> dict:
+    # Plots are content-addressed, so a hit skips both the fit and the render
+    from plot_store import get_plot_store, plot_filename
+    backend = validate_backend(backend)
+    series, freq, steps = forecast_horizon(df, periods, period_type)
+    store = get_plot_store()
+    fname = plot_filename(kind, series_digest(series), steps, backend, freq)
+    entry = store.lookup(fname)
+    if entry is None:
+        model, forecast = fit_forecast(df, periods, filters, backend, period_type)
+        with span("plot_figure"):
+            if backend != "prophet":
+                fig = _frame_figure(series, forecast, kind)
+            elif kind == "components":
+                fig = model.plot_components(forecast)
+            else:
+                fig = model.plot(forecast)
+        entry = store.save(fname, _figure_png(fig), kind, steps)
+    return entry
+
+
+def prophet_plot(df: pd.DataFrame, periods: int = 30, filters: dict = None, backend: str = None,
+                 period_type: str = "days") -> dict:
+    """Forecast plot PNG from the plot store, rendered on a miss; returns its index entry."""
+    return _stored_plot(df, periods, filters, "plot", backend, period_type)
+
+
+def prophet_components(df: pd.DataFrame, periods: int = 30, filters: dict = None, backend: str = None,
+                       period_type: str = "days") -> dict:
+    """Components plot PNG from the plot store, rendered on a miss; returns its index entry."""
+    return _stored_plot(df, periods, filters, "components", backend, period_type)